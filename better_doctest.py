@@ -0,0 +1,51 @@
+# Doctest output checking shared by the Sphinx build and by
+# bin/parallel_tests.py, which runs the same examples without Sphinx.
+#
+# conf.py lists this module as a Sphinx extension.  Its setup() only
+# registers a hook, and Sphinx's doctest runner is replaced with one
+# using BetterOutputChecker when the doctest builder starts; other
+# builders, and importers outside Sphinx, never import Sphinx from here.
+
+import doctest
+import re
+from functools import lru_cache
+
+ADDRESS = '0x7f00ed991e80'
+ADDRESS_RE = re.compile(r'\b0x[0-9a-f]{1,16}\b')
+
+def normalize_addresses(text):
+    """Replace each hex address in `text` with the same fixed address."""
+    if '0x' not in text:
+        return text
+    return ADDRESS_RE.sub(ADDRESS, text)
+
+# The expected output of an example is the same every time it is
+# checked, so remember its normalized form.
+_normalize_want = lru_cache(maxsize=4096)(normalize_addresses)
+
+class BetterOutputChecker(doctest.OutputChecker):
+    def check_output(self, want, got, optionflags):
+        if want == got:
+            return True
+        want = _normalize_want(want)
+        got = normalize_addresses(got)
+        if want == got:
+            return True
+        return doctest.OutputChecker.check_output(self, want, got, optionflags)
+
+def install_runner(app):
+    if app.builder.name != 'doctest':
+        return
+
+    import sphinx.ext.doctest as ext_doctest
+
+    class BetterDocTestRunner(ext_doctest.SphinxDocTestRunner):
+        def __init__(self, checker=None, verbose=None, optionflags=0):
+            checker = BetterOutputChecker()
+            doctest.DocTestRunner.__init__(self, checker, verbose, optionflags)
+
+    ext_doctest.SphinxDocTestRunner = BetterDocTestRunner
+
+def setup(app):
+    app.connect('builder-inited', install_runner)
+    return {'parallel_read_safe': True, 'parallel_write_safe': True}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare the import cost of loading conf.py, before and after it
+moved its doctest customization into the better_doctest extension.
+
+Each variant runs in a fresh interpreter under ``python3 -X importtime``,
+and the cumulative microseconds of its top-level imports are summed,
+less those of an interpreter that runs nothing at all:
+
+    bin/bench_conf_import.py [--repeat N]
+
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The tail that conf.py used to run for every builder.
+BASELINE = '''
+import doctest
+import re
+import sphinx.ext.doctest as ext_doctest
+
+ADDRESS_RE = re.compile(r'\\b0x[0-9a-f]{1,16}\\b')
+
+class BetterDocTestRunner(ext_doctest.SphinxDocTestRunner):
+    def __init__(self, checker=None, verbose=None, optionflags=0):
+        checker = BetterOutputChecker()
+        doctest.DocTestRunner.__init__(self, checker, verbose, optionflags)
+
+class BetterOutputChecker(doctest.OutputChecker):
+    def check_output(self, want, got, optionflags):
+        want = ADDRESS_RE.sub('0x7f00ed991e80', want)
+        got = ADDRESS_RE.sub('0x7f00ed991e80', got)
+        return doctest.OutputChecker.check_output(self, want, got, optionflags)
+
+ext_doctest.SphinxDocTestRunner = BetterDocTestRunner
+'''
+
+CONF = 'exec(open("conf.py").read())'
+
+VARIANTS = [
+    ('old conf.py', CONF + '\n' + BASELINE),
+    ('new conf.py', CONF),
+    ('new conf.py + better_doctest', CONF + '\nimport better_doctest'),
+    # What Sphinx goes on to import for an html build: the extension
+    # modules themselves, whose setup() the builder then calls.
+    ('new conf.py + extensions', CONF + '\nimport better_doctest\n'
+     'import sphinx.ext.doctest, sphinx.ext.viewcode'),
+]
+
+IMPORT_RE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)')
+
+def import_time(code):
+    """Return total cumulative import microseconds, or None on failure."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        return None
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_RE.match(line)
+        # Only count top-level imports; nested ones are included in
+        # their parents' cumulative time.
+        if match and not match.group(2):
+            total += int(match.group(1))
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    def median(code):
+        times = [import_time(code) for i in range(args.repeat)]
+        return None if None in times else statistics.median(times)
+
+    startup = median('pass')
+    for name, code in VARIANTS:
+        total = median(code)
+        if total is None:
+            print('  {:<30} failed (is Sphinx installed?)'.format(name))
+            continue
+        print('  {:<30} {:8.1f} ms'.format(name, (total - startup) / 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Time BetterOutputChecker against the original, on every doctest here.
+
+Runs each chapter's examples once, in this process, to record the
+(want, got, optionflags) triple of every output comparison, then
+replays those comparisons through both checkers:
+
+    bin/bench_doctest_checker.py [--repeat N]
+
+"""
+import argparse
+import doctest
+import time
+import warnings
+
+import parallel_tests
+from better_doctest import ADDRESS_RE, BetterOutputChecker
+
+class OriginalOutputChecker(doctest.OutputChecker):
+    # The checker as conf.py first defined it, normalizing both strings
+    # on every comparison.
+    def check_output(self, want, got, optionflags):
+        want = ADDRESS_RE.sub('0x7f00ed991e80', want)
+        got = ADDRESS_RE.sub('0x7f00ed991e80', got)
+        return doctest.OutputChecker.check_output(self, want, got, optionflags)
+
+class RecordingChecker(BetterOutputChecker):
+    comparisons = []
+
+    def check_output(self, want, got, optionflags):
+        self.comparisons.append((want, got, optionflags))
+        return BetterOutputChecker.check_output(self, want, got, optionflags)
+
+def record():
+    parallel_tests.BetterOutputChecker = RecordingChecker
+    warnings.simplefilter('ignore', SyntaxWarning)
+    for path in parallel_tests.find_documents():
+        parallel_tests.run_document(path)
+    return RecordingChecker.comparisons
+
+def replay(checker, comparisons, repeat):
+    check = checker.check_output
+    start = time.perf_counter()
+    for i in range(repeat):
+        results = [check(want, got, flags) for want, got, flags in comparisons]
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    comparisons = record()
+    print('{} comparisons, {} with identical output'.format(
+        len(comparisons), sum(w == g for w, g, f in comparisons)))
+    baseline = expected = None
+    for name, checker in [('original', OriginalOutputChecker()),
+                          ('fast path', BetterOutputChecker())]:
+        elapsed, results = replay(checker, comparisons, args.repeat)
+        baseline = baseline or elapsed
+        expected = expected or results
+        assert results == expected
+        print('  {:<10} {:8.3f} us per comparison  {:5.2f}x'.format(
+            name, elapsed / args.repeat / len(comparisons) * 1e6,
+            baseline / elapsed))
+
+if __name__ == '__main__':
+    main()
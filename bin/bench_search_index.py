@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure the search index built from the published docs/ tree.
+
+For several shard prefix lengths, reports the index's total and
+gzipped size and the bytes a query must fetch, then times a query
+answered from the index against scanning every page for the words:
+
+    bin/bench_search_index.py
+
+"""
+import gzip
+import json
+import os
+import tempfile
+import time
+
+import publish
+import search_index
+
+QUERIES = ['iterator', 'composite pattern', 'global variable',
+           'subclass', 'flyweight intern', 'xyzzy']
+
+def lookup(directory, terms, prefix_length, cache):
+    # What the layout.html script does: fetch each shard once, decode
+    # the postings, and intersect them.
+    def load(name):
+        if name not in cache:
+            path = os.path.join(directory, name + '.json')
+            try:
+                with open(path) as f:
+                    cache[name] = json.load(f)
+            except FileNotFoundError:
+                cache[name] = {}
+        return cache[name]
+
+    docs = load('docs')
+    counts = []
+    for term in terms:
+        shard = load(search_index.shard_name(term, prefix_length))
+        counts.append(dict(search_index.decode(shard.get(term, []))))
+    hits = set(counts[0]).intersection(*counts[1:])
+    return sorted(docs[n][0] for n in hits)
+
+def scan(pages, terms):
+    hits = []
+    for url, path in pages:
+        parser = search_index.ArticleParser()
+        with open(path, encoding='utf-8') as f:
+            parser.feed(f.read())
+        words = set(search_index.tokenize(' '.join(parser.text)))
+        if all(t in words for t in terms):
+            hits.append(url)
+    return sorted(hits)
+
+def main():
+    staged = dict(publish._walk(publish.DOCS_DIR, ''))
+    pages = search_index.chapters(staged)
+    html = sum(os.path.getsize(path) for url, path in pages)
+    print('{} chapters, {:,} bytes of HTML'.format(len(pages), html))
+    for prefix_length in 1, 2, 3:
+        with tempfile.TemporaryDirectory() as out_dir:
+            written = search_index.write_index(staged, out_dir, prefix_length)
+            directory = os.path.join(out_dir, search_index.SEARCH)
+            sizes = {}
+            for relative, path in written.items():
+                with open(path, 'rb') as f:
+                    data = f.read()
+                sizes[os.path.basename(relative)[:-5]] = (
+                    len(data), len(gzip.compress(data, 9)))
+            total = sum(raw for raw, packed in sizes.values())
+            packed = sum(packed for raw, packed in sizes.values())
+            print('prefix {}: {} files, {:,} bytes, {:,} gzipped'.format(
+                prefix_length, len(written), total, packed))
+
+            for query in QUERIES:
+                terms = search_index.tokenize(query)
+                names = {'docs'} | {search_index.shard_name(t, prefix_length)
+                                    for t in terms}
+                fetched = sum(sizes.get(n, (0, 0))[1] for n in names)
+                start = time.perf_counter()
+                hits = lookup(directory, terms, prefix_length, {})
+                indexed = time.perf_counter() - start
+                start = time.perf_counter()
+                assert scan(pages, terms) == hits
+                scanned = time.perf_counter() - start
+                print('  {:<20} {:2} hits  fetch {:6,} bytes gzipped  '
+                      '{:7.3f} ms vs scan {:7.1f} ms'.format(
+                          query, len(hits), fetched, indexed * 1e3,
+                          scanned * 1e3))
+
+if __name__ == '__main__':
+    main()
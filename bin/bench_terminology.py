@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare throughput and peak memory of the terminology.py file readers.
+
+Builds a synthetic corpus by repeating this repository's own chapters,
+then runs terminology.py over it once per reader, each in a fresh
+process so that its peak RSS can be measured on its own:
+
+    bin/bench_terminology.py --megabytes 1024
+
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, 'terminology.py')
+
+MODES = (
+    ('whole file', []),
+    ('1 MB chunks', ['--chunk-size', str(1 << 20)]),
+    ('mmap', ['--mmap']),
+)
+
+def build_corpus(directory, megabytes, file_megabytes):
+    sources = sorted(glob.glob(os.path.join(HERE, '..', '*', '*', '*.rst')))
+    sample = ''.join(open(path).read() for path in sources).encode('utf-8')
+    file_size = file_megabytes << 20
+    remaining = megabytes << 20
+    n = 0
+    while remaining > 0:
+        size = min(file_size, remaining)
+        with open(os.path.join(directory, 'pep-{:04}.txt'.format(n)),
+                  'wb') as f:
+            written = 0
+            while written < size:
+                block = sample[:size - written]
+                f.write(block)
+                written += len(block)
+        remaining -= size
+        n += 1
+
+def run(args):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, SCRIPT] + args,
+                               stdout=subprocess.DEVNULL)
+    pid, status, rusage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise SystemExit('terminology.py failed: {}'.format(args))
+    return elapsed, rusage.ru_maxrss / 1024.0
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--megabytes', type=int, default=1024,
+                        help='total corpus size (default: 1024)')
+    parser.add_argument('--file-megabytes', type=int, default=256,
+                        help='size of each corpus file (default: 256)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_corpus(directory, args.megabytes, args.file_megabytes)
+        print('{:>12}  {:>8}  {:>8}  {:>10}'.format(
+            'reader', 'seconds', 'MB/s', 'peak RSS'))
+        for name, options in MODES:
+            elapsed, rss = run(options + [directory])
+            print('{:>12}  {:8.2f}  {:8.1f}  {:7.1f} MB'.format(
+                name, elapsed, args.megabytes / elapsed, rss))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""Serve the site while you edit it, rebuilding only what changed.
+
+Watches the ``.rst`` sources, ``_static`` and ``_templates`` (with
+inotify where Linux offers it, and by polling elsewhere).  When a
+chapter is saved, only that document is rebuilt by a Sphinx
+application kept alive in this process, only its doctests are rerun
+by ``bin/parallel_tests.py`` in the background, and every open browser
+tab is told to reload over a websocket.  Pages are served from memory:
+
+    bin/devserver.py [--port 8000]
+
+"""
+import argparse
+import base64
+import ctypes
+import ctypes.util
+import hashlib
+import mimetypes
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DIR = os.path.join(ROOT, '_build')
+OUT_DIR = os.path.join(BUILD_DIR, 'dirhtml')
+DOCTREE_DIR = os.path.join(BUILD_DIR, 'doctrees')
+SKIP_DIRS = {'_build', 'docs', '.git', '__pycache__'}
+WATCHED_SUFFIXES = ('.rst', '.css', '.html', '.py', '.txt', '.png')
+
+RELOAD_PATH = '/_reload'
+RELOAD_SCRIPT = (b'<script>new WebSocket("ws://" + location.host + "'
+                 + RELOAD_PATH.encode() + b'").onmessage = function () '
+                 b'{ location.reload(); };</script>')
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Watching.
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE \
+    | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+def watched_directories(root=ROOT):
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = [d for d in subdirectories if d not in SKIP_DIRS]
+        yield directory
+
+class InotifyWatcher(object):
+    """Reports changed files using the Linux inotify API."""
+
+    def __init__(self, root=ROOT):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                    ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}
+        for directory in watched_directories(root):
+            self.watch(directory)
+
+    def watch(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), EVENT_MASK)
+        if wd >= 0:
+            self.directories[wd] = directory
+
+    def changes(self, timeout):
+        """Wait up to `timeout` seconds; return the set of changed paths."""
+        changed = set()
+        while select.select([self.fd], [], [], timeout)[0]:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            position = 0
+            while position < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(
+                    data, position)
+                position += EVENT_HEADER.size
+                name = data[position:position + length].rstrip(b'\0')
+                position += length
+                directory = self.directories.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) \
+                       and os.path.basename(path) not in SKIP_DIRS:
+                        self.watch(path)
+                else:
+                    changed.add(path)
+            # Editors often save with several events in quick
+            # succession, so gather whatever follows close behind.
+            timeout = 0.05
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher(object):
+    """Reports changed files by comparing modification times."""
+
+    def __init__(self, root=ROOT, interval=0.25):
+        self.root = root
+        self.interval = interval
+        self.mtimes = self._scan()
+
+    def _scan(self):
+        mtimes = {}
+        for directory in watched_directories(self.root):
+            for entry in os.scandir(directory):
+                if entry.is_file() and entry.name.endswith(WATCHED_SUFFIXES):
+                    mtimes[entry.path] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def changes(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            mtimes = self._scan()
+            changed = {path for path in mtimes.keys() | self.mtimes.keys()
+                       if mtimes.get(path) != self.mtimes.get(path)}
+            self.mtimes = mtimes
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+def make_watcher(root=ROOT):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root)
+
+# Building.
+
+def chapters(changed):
+    """Return the documents to rebuild for a set of changed paths.
+
+    Besides the .rst files themselves, a chapter is rebuilt when a file
+    it includes from its own directory, like an example script, changes.
+
+    """
+    documents = set()
+    for path in changed:
+        directory = os.path.dirname(path)
+        if path.endswith('.rst'):
+            documents.add(path)
+        elif directory != ROOT:
+            index = os.path.join(directory, 'index.rst')
+            if os.path.exists(index):
+                documents.add(index)
+    return sorted(documents)
+
+class Builder(object):
+    """A Sphinx application kept alive between incremental builds.
+
+    A live application never reads conf.py again, so a change to it
+    starts a new application.  So does the next change after a build
+    that failed, since the failure may have left the application's
+    environment half updated.
+
+    """
+    def __init__(self, out_dir=OUT_DIR, src_dir=ROOT,
+                 doctree_dir=DOCTREE_DIR, status=sys.stdout,
+                 warning=sys.stderr):
+        self.out_dir = out_dir
+        self.src_dir = src_dir
+        self.doctree_dir = doctree_dir
+        self.status = status
+        self.warning = warning
+        self.app = None
+        self._start()
+
+    def _start(self, force_all=False):
+        from sphinx.application import Sphinx
+        app = Sphinx(self.src_dir, self.src_dir, self.out_dir,
+                     self.doctree_dir, 'dirhtml', status=self.status,
+                     warning=self.warning)
+        app.build(force_all=force_all)
+        self.app = app
+
+    def rebuild(self, changed):
+        """Rebuild for the changed paths; return the documents rebuilt."""
+        documents = chapters(changed)
+        templates = os.path.join(self.src_dir, '_templates')
+        force_all = any(templates in p for p in changed)
+        if self.app is None or any(p.endswith('conf.py') for p in changed):
+            self.app = None
+            self._start(force_all=True)
+            return documents
+        try:
+            if force_all:
+                self.app.build(force_all=True)
+            elif documents:
+                self.app.build(filenames=documents)
+            else:
+                # Static files alone are simply copied across again.
+                self.app.build(filenames=[])
+        except BaseException:
+            self.app = None
+            raise
+        return documents
+
+# Serving.
+
+class MemorySite(object):
+    """The built site, held in memory and refreshed from disk."""
+
+    def __init__(self, out_dir=OUT_DIR):
+        self.out_dir = out_dir
+        self.files = {}
+        self.mtimes = {}
+        self.refresh()
+
+    def refresh(self):
+        """Reload files whose mtimes changed; return how many did."""
+        seen = set()
+        count = 0
+        for directory, subdirectories, filenames in os.walk(self.out_dir):
+            subdirectories[:] = [d for d in subdirectories
+                                 if not d.startswith('.')]
+            for name in filenames:
+                path = os.path.join(directory, name)
+                url = '/' + os.path.relpath(path, self.out_dir).replace(
+                    os.sep, '/')
+                seen.add(url)
+                mtime = os.stat(path).st_mtime_ns
+                if self.mtimes.get(url) == mtime:
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if name.endswith('.html'):
+                    data = data.replace(b'</body>', RELOAD_SCRIPT + b'</body>')
+                self.files[url] = data
+                self.mtimes[url] = mtime
+                count += 1
+        for url in set(self.files) - seen:
+            del self.files[url]
+            del self.mtimes[url]
+        return count
+
+    def get(self, url):
+        url = url.split('?', 1)[0].split('#', 1)[0]
+        if url.endswith('/'):
+            url += 'index.html'
+        return self.files.get(url)
+
+def websocket_accept(key):
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+def websocket_frame(text):
+    payload = text.encode('utf-8')
+    if len(payload) < 126:
+        header = struct.pack('!BB', 0x81, len(payload))
+    else:
+        header = struct.pack('!BBH', 0x81, 126, len(payload))
+    return header + payload
+
+class Handler(BaseHTTPRequestHandler):
+    site = None
+    sockets = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self.upgrade()
+        data = self.site.get(self.path)
+        if data is None and not self.path.endswith('/') \
+           and self.site.get(self.path + '/') is not None:
+            self.send_response(301)
+            self.send_header('Location', self.path + '/')
+            self.end_headers()
+            return
+        if data is None:
+            self.send_error(404)
+            return
+        path = self.path.split('?', 1)[0]
+        content_type = 'text/html' if path.endswith('/') else \
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def upgrade(self):
+        key = self.headers.get('Sec-WebSocket-Key')
+        if key is None:
+            self.send_error(400)
+            return
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', websocket_accept(key))
+        self.end_headers()
+        self.wfile.flush()
+        with self.lock:
+            self.sockets.add(self.connection)
+        try:
+            # The browser sends nothing we need; wait for it to go away.
+            while self.connection.recv(4096):
+                pass
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.sockets.discard(self.connection)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def broadcast(text):
+    frame = websocket_frame(text)
+    with Handler.lock:
+        sockets = list(Handler.sockets)
+    for sock in sockets:
+        try:
+            sock.sendall(frame)
+        except OSError:
+            pass
+
+def serve(site, port):
+    Handler.site = site
+    Handler.sockets = set()
+    server = ThreadingHTTPServer(('localhost', port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def run_doctests(documents):
+    if documents:
+        return subprocess.Popen([sys.executable, os.path.join(
+            ROOT, 'bin', 'parallel_tests.py')] + documents)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--poll', action='store_true',
+                        help='poll for changes instead of using inotify')
+    args = parser.parse_args(argv)
+
+    watcher = PollingWatcher() if args.poll else make_watcher()
+    builder = Builder()
+    site = MemorySite()
+    serve(site, args.port)
+    print('Serving on http://localhost:{}/ ({})'.format(
+        args.port, type(watcher).__name__))
+    try:
+        while True:
+            changed = watcher.changes(3600)
+            changed = {p for p in changed if p.endswith(WATCHED_SUFFIXES)
+                       and not os.path.basename(p).startswith('.')}
+            if not changed:
+                continue
+            start = time.perf_counter()
+            try:
+                documents = builder.rebuild(changed)
+            except Exception:
+                # Keep serving the last pages that built, and try again
+                # on the next change.
+                traceback.print_exc()
+                print('Build failed; still serving the previous pages.')
+                continue
+            reloaded = site.refresh()
+            broadcast('reload')
+            print('{} changed: {} pages reloaded in {:.2f} s'.format(
+                ', '.join(os.path.relpath(p, ROOT) for p in sorted(changed)),
+                reloaded, time.perf_counter() - start))
+            run_doctests(documents)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Run the chapter doctests and unit tests across a pool of processes.
+
+``make doctest`` runs every chapter through Sphinx one after another.
+This script pulls the same examples out of each ``.rst`` file itself
+(``testsetup``, ``testcode``, ``testoutput``, ``testcleanup`` and
+``doctest`` directives, plus bare ``>>>`` blocks), groups them the way
+``sphinx.ext.doctest`` does, and runs each document in a fresh worker
+process with the address-normalizing checker from ``better_doctest``.
+Each ``gang-of-four/*/test*.py``, ``python/*/test*.py``, and
+``bin/test*.py`` file runs in the same pool.  Results are printed in a
+stable order, whatever order the workers finish in:
+
+    bin/parallel_tests.py [-j JOBS] [-v] [-k PATTERN] [path ...]
+
+"""
+import argparse
+import doctest
+import glob
+import io
+import os
+import re
+import sys
+import textwrap
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from better_doctest import BetterOutputChecker
+
+# The option flags sphinx.ext.doctest uses by default.
+DEFAULT_FLAGS = (doctest.ELLIPSIS | doctest.IGNORE_EXCEPTION_DETAIL
+                 | doctest.DONT_ACCEPT_TRUE_FOR_1)
+
+TEST_DIRECTIVES = {'testsetup', 'testcleanup', 'testcode', 'testoutput',
+                   'doctest'}
+# Directives whose bodies are shown verbatim rather than parsed, so
+# that Sphinx never finds doctest blocks in them.  The bodies of all
+# other directives, like admonitions, are parsed as ordinary text.
+LITERAL_DIRECTIVES = {'code', 'code-block', 'sourcecode', 'literalinclude',
+                      'parsed-literal', 'highlight', 'math', 'raw'}
+DIRECTIVE_RE = re.compile(r'( *)\.\. ([\w-]+)::(.*)$')
+OPTION_RE = re.compile(r' *:([\w-]+):(.*)$')
+
+class Block(object):
+    """One test directive or doctest block from a document."""
+
+    def __init__(self, kind, groups, code, lineno, options):
+        self.kind = kind
+        self.groups = groups
+        self.code = code
+        self.lineno = lineno
+        self.options = options
+
+class Group(object):
+    """The examples that share one globals namespace, as in Sphinx."""
+
+    def __init__(self, name):
+        self.name = name
+        self.setup = []
+        self.tests = []
+        self.cleanup = []
+
+    def add(self, block):
+        if block.kind == 'testsetup':
+            self.setup.append(block)
+        elif block.kind == 'testcleanup':
+            self.cleanup.append(block)
+        elif block.kind == 'testoutput':
+            if self.tests and len(self.tests[-1]) == 2 \
+               and self.tests[-1][1] is None:
+                self.tests[-1][1] = block
+        elif block.kind == 'testcode':
+            self.tests.append([block, None])
+        else:
+            self.tests.append([block])
+
+def find_documents(root=ROOT):
+    paths = []
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(
+            d for d in subdirectories
+            if not d.startswith(('.', '_')) and d != 'docs')
+        paths.extend(os.path.join(directory, name)
+                     for name in sorted(filenames) if name.endswith('.rst'))
+    return paths
+
+def find_test_files(root=ROOT):
+    return sorted(glob.glob(os.path.join(root, 'gang-of-four', '*',
+                                         'test*.py'))
+                  + glob.glob(os.path.join(root, 'python', '*', 'test*.py'))
+                  + glob.glob(os.path.join(root, 'bin', 'test*.py')))
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+def _indented_block(lines, i, indent):
+    # Return the index just past the lines, starting at `i`, that are
+    # either blank or indented further than `indent`.
+    while i < len(lines) and (not lines[i].strip()
+                              or _indent(lines[i]) > indent):
+        i += 1
+    return i
+
+def _parse_flags(text):
+    options = {}
+    for flag in text.replace(',', ' ').split():
+        options[doctest.OPTIONFLAGS_BY_NAME[flag[1:]]] = flag[0] == '+'
+    return options
+
+def parse_blocks(text):
+    """Extract the test directives and doctest blocks from reST text."""
+    lines = text.expandtabs().splitlines()
+    blocks = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        indent = _indent(line)
+        match = DIRECTIVE_RE.match(line)
+        if match:
+            end = _indented_block(lines, i + 1, indent)
+            name = match.group(2)
+            if name in TEST_DIRECTIVES:
+                j = i + 1
+                options = {}
+                while j < end and OPTION_RE.match(lines[j]):
+                    key, value = OPTION_RE.match(lines[j]).groups()
+                    if key == 'options':
+                        options.update(_parse_flags(value))
+                    j += 1
+                while j < end and not lines[j].strip():
+                    j += 1
+                argument = match.group(3).strip()
+                groups = [g.strip() for g in argument.split(',')] \
+                    if argument else ['default']
+                code = textwrap.dedent('\n'.join(lines[j:end])).strip('\n')
+                blocks.append(Block(name, groups, code + '\n', j + 1, options))
+                i = end
+            elif name in LITERAL_DIRECTIVES:
+                i = end
+            else:
+                i += 1
+        elif line.lstrip().startswith('.. '):
+            i = _indented_block(lines, i + 1, indent)
+        elif line.lstrip().startswith('>>>') and (
+                i == 0 or not lines[i - 1].strip()):
+            end = i
+            while end < len(lines) and lines[end].strip():
+                end += 1
+            code = textwrap.dedent('\n'.join(lines[i:end]))
+            blocks.append(Block('doctest', ['default'], code + '\n',
+                                i + 1, {}))
+            i = end
+        elif line.rstrip().endswith('::'):
+            # A paragraph ending in "::" introduces a literal block,
+            # whose ">>>" lines are for display rather than testing.
+            i = _indented_block(lines, i + 1, indent)
+        else:
+            i += 1
+    return blocks
+
+def parse_groups(text):
+    groups = {}
+    blocks = parse_blocks(text)
+    for block in blocks:
+        for name in block.groups:
+            if name != '*' and name not in groups:
+                groups[name] = Group(name)
+    for block in blocks:
+        names = groups if block.groups == ['*'] else block.groups
+        for name in names:
+            groups[name].add(block)
+    return list(groups.values())
+
+class _Compiler(object):
+    # doctest compiles each example in 'single' mode, which accepts
+    # only one statement; like Sphinx, switch to 'exec' for testcode.
+    mode = 'single'
+
+    def __call__(self, source, filename, mode, flags=0, dont_inherit=False):
+        return compile(source, filename, self.mode, flags, dont_inherit)
+
+def make_test(pair, group_name, name):
+    """Build a DocTest, and its compile mode, from one group entry."""
+    parser = doctest.DocTestParser()
+    if len(pair) == 1:
+        block = pair[0]
+        test = parser.get_doctest(block.code, {}, group_name, name, 0)
+        for example in test.examples:
+            options = dict(block.options)
+            options.update(example.options)
+            example.options = options
+            example.lineno += block.lineno - 1
+        return test, 'single'
+    code, output = pair
+    want = output.code if output is not None else ''
+    options = dict(output.options) if output is not None else {}
+    options[doctest.DONT_ACCEPT_BLANKLINE] = True
+    match = parser._EXCEPTION_RE.match(want)
+    exc_msg = match.group('msg') if match else None
+    example = doctest.Example(code.code, want, exc_msg=exc_msg,
+                              lineno=code.lineno - 1, options=options)
+    return doctest.DocTest([example], {}, group_name, name, 0, None), 'exec'
+
+def run_document(path):
+    """Run one document's groups; return (failures, tries, report)."""
+    os.chdir(ROOT)
+    compiler = _Compiler()
+    out = io.StringIO()
+    checker = BetterOutputChecker()
+    name = os.path.relpath(path, ROOT)
+    failures = tries = 0
+    with open(path, encoding='utf-8') as f:
+        groups = parse_groups(f.read())
+
+    def run(runner, test):
+        nonlocal failures, tries
+        result = runner.run(test, out=out.write, clear_globs=False)
+        failures += result.failed
+        tries += result.attempted
+        return not result.failed
+
+    def run_code(blocks, what, ns):
+        compiler.mode = 'exec'
+        examples = [doctest.Example(b.code, '', lineno=b.lineno)
+                    for b in blocks]
+        if not examples:
+            return True
+        test = doctest.DocTest(examples, {}, '{} ({} code)'.format(
+            group.name, what), name, 0, None)
+        test.globs = ns
+        return run(doctest.DocTestRunner(checker, False, DEFAULT_FLAGS), test)
+
+    doctest.compile = compiler
+    try:
+        for group in groups:
+            ns = {}
+            if not run_code(group.setup, 'setup', ns):
+                continue
+            runner = doctest.DocTestRunner(checker, False, DEFAULT_FLAGS)
+            for pair in group.tests:
+                test, compiler.mode = make_test(pair, group.name, name)
+                if not test.examples:
+                    continue
+                test.globs = ns
+                run(runner, test)
+            run_code(group.cleanup, 'cleanup', ns)
+    finally:
+        del doctest.compile
+    return failures, tries, out.getvalue()
+
+def run_test_file(path, patterns=None):
+    """Run one unittest file; return (failures, tries, report).
+
+    Like ``unittest -k``, `patterns` limits the run to tests whose
+    names match one of them.
+
+    """
+    os.chdir(ROOT)
+    module = os.path.relpath(path, ROOT)[:-3].replace(os.sep, '.')
+    loader = unittest.TestLoader()
+    if patterns:
+        loader.testNamePatterns = [p if '*' in p else '*{}*'.format(p)
+                                   for p in patterns]
+    suite = loader.loadTestsFromName(module)
+    out = io.StringIO()
+    result = unittest.TextTestRunner(out, verbosity=0).run(suite)
+    failures = len(result.failures) + len(result.errors)
+    report = out.getvalue() if failures else ''
+    return failures, result.testsRun, report
+
+def run_task(task):
+    function, path = task
+    start = time.perf_counter()
+    failures, tries, report = function(path)
+    return path, failures, tries, report, time.perf_counter() - start
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('paths', nargs='*',
+                        help='.rst or test*.py files (default: all)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes (default: %(default)s)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='list every file with its timing')
+    parser.add_argument('-k', dest='patterns', action='append',
+                        metavar='PATTERN',
+                        help='only run unit tests whose names match'
+                        ' PATTERN, as unittest -k does')
+    args = parser.parse_args(argv)
+
+    if args.paths:
+        paths = [os.path.abspath(p) for p in args.paths]
+    else:
+        paths = find_documents() + find_test_files()
+    run_tests = partial(run_test_file, patterns=args.patterns)
+    tasks = [(run_tests if p.endswith('.py') else run_document, p)
+             for p in paths]
+
+    start = time.perf_counter()
+    total_failures = total_tries = 0
+    failed = []
+    # A fresh process per task keeps each document's namespace, working
+    # directory, and sys.path changes from leaking into the next.  The
+    # workers are not daemons, so unit tests can start pools of their own.
+    with ProcessPoolExecutor(args.jobs, max_tasks_per_child=1) as executor:
+        for path, failures, tries, report, elapsed in executor.map(run_task,
+                                                                   tasks):
+            total_failures += failures
+            total_tries += tries
+            name = os.path.relpath(path, ROOT)
+            if failures:
+                failed.append(name)
+                sys.stdout.write(report)
+            if failures or args.verbose:
+                print('{:<50} {:4} tests {:4} failures {:6.2f} s'.format(
+                    name, tries, failures, elapsed))
+
+    print('{} tests in {} files, {} failures, {:.2f} s'.format(
+        total_tries, len(tasks), total_failures,
+        time.perf_counter() - start))
+    for name in failed:
+        print('FAILED', name)
+    return 1 if total_failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Optimize the built site for serving, between the build and publish.
+
+Takes the map of docs/ paths to built files that publish.py stages,
+and writes optimized versions into a staging directory, which
+publish.py then copies from in their place:
+
+* ``_static`` assets are renamed with a fingerprint of their content,
+  like ``style.3f2a9c1e.css``, so a server can let clients cache them
+  forever; the stylesheet's ``url()`` references to its fonts and
+  every page's references to ``_static`` are rewritten to match.
+* PNG images have their pixel data recompressed losslessly.
+* Each file gets ``.gz`` and, if the optional ``brotli`` package is
+  installed, ``.br`` siblings for servers that can send them as-is,
+  whenever they save at least a few percent.
+
+Run directly, it prints how many bytes each step saves per asset:
+
+    bin/postbuild.py
+
+"""
+import gzip
+import hashlib
+import os
+import re
+import struct
+import sys
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC = '_static/'
+MIN_SAVING = 0.05
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+CSS_URL_RE = re.compile(r'''url\((['"]?)([^'")]+)\1\)''')
+# Only relative and site-absolute references are to our own _static;
+# a full URL to some other site's _static directory is left alone.
+HTML_REF_RE = re.compile(
+    r'''((?:href|src)=")(/|(?:\.\./)*)_static/([^"#?]+)''')
+
+def fingerprint(relative, data):
+    root, ext = os.path.splitext(relative)
+    digest = hashlib.blake2b(data, digest_size=4).hexdigest()
+    return '{}.{}{}'.format(root, digest, ext)
+
+def optimize_png(data):
+    """Recompress a PNG's image data, returning the smaller version."""
+    if data[:8] != PNG_SIGNATURE:
+        return data
+    chunks = []
+    position = 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        chunks.append((kind, data[position + 8:position + 8 + length]))
+        position += length + 12
+    idat = b''.join(body for kind, body in chunks if kind == b'IDAT')
+    raw = zlib.decompress(idat)
+    best = idat
+    for strategy in zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidate = compressor.compress(raw) + compressor.flush()
+        if len(candidate) < len(best):
+            best = candidate
+    if best is idat:
+        return data
+
+    # Keep every other chunk where it was, replacing the run of IDAT
+    # chunks with a single one.
+    out = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        if kind == b'IDAT':
+            if best is None:
+                continue
+            body, best = best, None
+        out.append(struct.pack('>I4s', len(body), kind) + body
+                   + struct.pack('>I', zlib.crc32(kind + body)))
+    return b''.join(out)
+
+def compressed_siblings(data):
+    """Return (suffix, bytes) for each compression worth keeping."""
+    siblings = [('.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        siblings.append(('.br', brotli.compress(data)))
+    return [(suffix, packed) for suffix, packed in siblings
+            if len(packed) <= len(data) * (1 - MIN_SAVING)]
+
+def _write(path, data):
+    # Leave unchanged files alone, so their mtimes keep publish.py's
+    # manifest valid and the next publish does not rehash them.
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _changed(digests, path):
+    previous = digests.known.get(path)
+    return digests(path) != (previous[2] if previous else None)
+
+def _staged_statics(stage_dir):
+    # After a complete run, the stage's _static holds exactly the
+    # fingerprinted names that its pages were rewritten to refer to.
+    names = set()
+    top = os.path.join(stage_dir, STATIC)
+    for directory, subdirectories, filenames in os.walk(top):
+        for name in filenames:
+            if not name.endswith(('.gz', '.br')):
+                path = os.path.join(directory, name)
+                names.add(STATIC + os.path.relpath(path, top))
+    return names
+
+def process(staged, stage_dir, digests=None):
+    """Optimize `staged` files, returning the new map and a report.
+
+    Each report row is (path, original size, optimized size, gzip size,
+    brotli size), with None for a compression that was not kept.
+
+    If `digests` is a publish.Digests holding what the previous run
+    saw, files whose content has not changed since are neither read
+    nor optimized and compressed again; their staged output is reused.
+    ``_static`` assets are always read, to fingerprint them, but their
+    fingerprinted names already say whether the stage is up to date.
+
+    """
+    if digests is None:
+        fresh = set(staged)
+    else:
+        fresh = {relative for relative, path in staged.items()
+                 if _changed(digests, path)}
+    contents = {relative: _read(path) for relative, path in staged.items()
+                if relative in fresh or relative.startswith(STATIC)}
+    renames = {}
+
+    # Fingerprint stylesheets last, after the names of the fonts and
+    # images they refer to are known.
+    static = sorted((r for r in contents if r.startswith(STATIC)),
+                    key=lambda r: (r.endswith('.css'), r))
+    for relative in static:
+        data = contents[relative]
+        if relative.endswith('.css'):
+            directory = os.path.dirname(relative)
+
+            def rewrite(match):
+                target = os.path.normpath(os.path.join(directory,
+                                                       match.group(2)))
+                if target not in renames:
+                    return match.group(0)
+                name = os.path.relpath(renames[target], directory)
+                return 'url({0}{1}{0})'.format(match.group(1), name)
+
+            text = CSS_URL_RE.sub(rewrite, data.decode('utf-8'))
+            data = contents[relative] = text.encode('utf-8')
+        renames[relative] = fingerprint(relative, data)
+
+    def rewrite_html(match):
+        target = STATIC + match.group(3)
+        if target not in renames:
+            return match.group(0)
+        return match.group(1) + match.group(2) + renames[target]
+
+    # Pages must be rewritten again whenever any fingerprint changed.
+    same_renames = _staged_statics(stage_dir) == set(renames.values())
+
+    new_staged = {}
+    report = []
+    for relative, source in sorted(staged.items()):
+        original = os.path.getsize(source)
+        renamed = renames.get(relative, relative)
+        path = os.path.join(stage_dir, renamed)
+        if relative in renames:
+            reuse = os.path.exists(path)
+        else:
+            reuse = (relative not in fresh and os.path.exists(path)
+                     and (same_renames or not relative.endswith('.html')))
+        if reuse:
+            new_staged[renamed] = path
+            sizes = {}
+            for suffix in '.gz', '.br':
+                if os.path.exists(path + suffix):
+                    new_staged[renamed + suffix] = path + suffix
+                    sizes[suffix] = os.path.getsize(path + suffix)
+            report.append((renamed, original, os.path.getsize(path),
+                           sizes.get('.gz'), sizes.get('.br')))
+            continue
+
+        data = contents.get(relative)
+        if data is None:
+            data = _read(source)
+        if relative.endswith('.html'):
+            data = HTML_REF_RE.sub(rewrite_html, data.decode('utf-8')
+                                   ).encode('utf-8')
+        elif relative.endswith('.png'):
+            data = optimize_png(data)
+        _write(path, data)
+        new_staged[renamed] = path
+        sizes = {}
+        for suffix, packed in compressed_siblings(data):
+            _write(path + suffix, packed)
+            new_staged[renamed + suffix] = path + suffix
+            sizes[suffix] = len(packed)
+        report.append((renamed, original, len(data), sizes.get('.gz'),
+                       sizes.get('.br')))
+
+    # Drop what earlier runs staged under names that are gone, like
+    # superseded fingerprints.
+    keep = set(new_staged.values())
+    for directory, subdirectories, filenames in os.walk(stage_dir):
+        for name in filenames:
+            path = os.path.join(directory, name)
+            if path not in keep:
+                os.remove(path)
+    return new_staged, report
+
+def print_report(report, file=sys.stdout):
+    def size(n):
+        return '{:>9,}'.format(n) if n is not None else '        -'
+
+    print('{:<52} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+        'asset', 'original', 'optimized', 'gzip', 'brotli', 'saved'),
+        file=file)
+    total_original = total_served = 0
+    for relative, original, optimized, gz, br in report:
+        served = min(n for n in (optimized, gz, br) if n is not None)
+        total_original += original
+        total_served += served
+        print('{:<52} {} {} {} {} {}'.format(
+            relative, size(original), size(optimized), size(gz), size(br),
+            size(original - served)), file=file)
+    print('{:<52} {} {:>39}'.format('total', size(total_original),
+                                    size(total_original - total_served)),
+          file=file)
+
+if __name__ == '__main__':
+    import publish
+    staged, report = process(publish.staged_files(), publish.POSTBUILD_DIR)
+    print_report(report)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Publish the built site into docs/, touching only what changed.
+
+Runs an incremental ``make dirhtml``, keeping Sphinx's doctree cache,
+then compares a content digest of every generated file against the
+manifest written by the previous publish.  Only files whose content
+changed are copied into ``docs/``, and files that the build no longer
+produces are deleted from it, except for those GitHub Pages needs:
+
+    bin/publish.py [--no-build] [--no-postbuild] [--dry-run]
+
+Between the two steps, search_index.py adds the search index to the
+staged files, and postbuild.py fingerprints, optimizes, and
+precompresses those that changed since the last publish.
+
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DIR = os.path.join(ROOT, '_build')
+DOCS_DIR = os.path.join(ROOT, 'docs')
+MANIFEST = os.path.join(BUILD_DIR, 'publish-manifest.json')
+POSTBUILD_DIR = os.path.join(BUILD_DIR, 'postbuild')
+POSTBUILD_MANIFEST = os.path.join(BUILD_DIR, 'postbuild-manifest.json')
+
+# What `make sync` used to copy: these outputs of the dirhtml build,
+# plus the hand-written files in the top-level _static directory.
+BUILT = ('fowler-refactoring', 'gang-of-four', 'index.html', 'python',
+         '_images')
+STATIC = '_static'
+KEEP = {'CNAME', '.nojekyll'}
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _walk(top, prefix):
+    if os.path.isfile(top):
+        yield prefix, top
+        return
+    for directory, subdirectories, filenames in os.walk(top):
+        subdirectories.sort()
+        for name in sorted(filenames):
+            path = os.path.join(directory, name)
+            yield os.path.join(prefix, os.path.relpath(path, top)), path
+
+def staged_files(build_dir=BUILD_DIR):
+    """Map each path under docs/ to the file that should be there."""
+    staged = {}
+    html = os.path.join(build_dir, 'dirhtml')
+    for name in BUILT:
+        staged.update(_walk(os.path.join(html, name), name))
+    staged.update(_walk(os.path.join(ROOT, STATIC), STATIC))
+    return staged
+
+def build():
+    subprocess.run(['make', 'dirhtml'], cwd=ROOT, check=True)
+
+class Digests(object):
+    """Content digests that trust a file's size and mtime when unchanged."""
+
+    def __init__(self, known=None):
+        self.known = known or {}
+        self.hashed = 0
+
+    def __call__(self, path):
+        st = os.stat(path)
+        entry = self.known.get(path)
+        if entry and entry[:2] == [st.st_size, st.st_mtime_ns]:
+            return entry[2]
+        self.hashed += 1
+        digest = _digest(path)
+        self.known[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(files, path=MANIFEST):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'files': files}, f, indent=0, sort_keys=True)
+
+def publish(staged, docs_dir=DOCS_DIR, manifest_path=MANIFEST,
+            dry_run=False):
+    """Copy changed files into `docs_dir` and delete orphans.
+
+    Returns lists of the paths copied, deleted, and left unchanged,
+    and the number of files whose contents had to be hashed.
+
+    """
+    manifest = load_manifest(manifest_path)
+    digests = Digests(manifest.get('files'))
+    published = {relative for relative, path in _walk(docs_dir, '')}
+
+    copied, deleted, unchanged = [], [], []
+    for relative, source in sorted(staged.items()):
+        target = os.path.join(docs_dir, relative)
+        if relative in published and digests(source) == digests(target):
+            unchanged.append(relative)
+            continue
+        copied.append(relative)
+        if not dry_run:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+
+    for relative in sorted(published - set(staged)):
+        if relative in KEEP:
+            continue
+        deleted.append(relative)
+        if not dry_run:
+            os.remove(os.path.join(docs_dir, relative))
+            _remove_empty_parents(docs_dir, relative)
+
+    if not dry_run:
+        # Keep only entries for files that still exist, so the manifest
+        # does not grow with every build directory that comes and goes.
+        files = {}
+        for relative in staged:
+            for path in staged[relative], os.path.join(docs_dir, relative):
+                digests(path)
+                files[path] = digests.known[path]
+        save_manifest(files, manifest_path)
+    return copied, deleted, unchanged, digests.hashed
+
+def _remove_empty_parents(docs_dir, relative):
+    directory = os.path.dirname(relative)
+    while directory:
+        path = os.path.join(docs_dir, directory)
+        if os.listdir(path):
+            break
+        os.rmdir(path)
+        directory = os.path.dirname(directory)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--no-build', action='store_true',
+                        help='publish the existing _build/dirhtml as is')
+    parser.add_argument('--no-postbuild', action='store_true',
+                        help='publish files exactly as Sphinx built them')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='report what would change without changing it')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if not args.no_build:
+        build()
+    built = time.perf_counter()
+    staged = staged_files()
+    import search_index
+    staged.update(search_index.write_index(staged, BUILD_DIR))
+    if not args.no_postbuild:
+        import postbuild
+        # Postbuild always rewrites its stage, even for a dry run, so
+        # what it saw is always saved for the next run to compare with.
+        sources = list(staged.values())
+        digests = Digests(load_manifest(POSTBUILD_MANIFEST).get('files'))
+        staged, report = postbuild.process(staged, POSTBUILD_DIR, digests)
+        save_manifest({path: digests.known[path] for path in sources},
+                      POSTBUILD_MANIFEST)
+        postbuild.print_report(report)
+    processed = time.perf_counter()
+    copied, deleted, unchanged, hashed = publish(staged,
+                                                 dry_run=args.dry_run)
+    done = time.perf_counter()
+
+    for relative in copied:
+        print('copy  ', relative)
+    for relative in deleted:
+        print('delete', relative)
+    print('{} copied, {} deleted, {} unchanged, {} files hashed'.format(
+        len(copied), len(deleted), len(unchanged), hashed))
+    print('build {:.2f} s, postbuild {:.2f} s, publish {:.2f} s'.format(
+        built - start, processed - built, done - processed))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Build a sharded inverted index for searching the site offline.
+
+Tokenizes the article text of every chapter page and writes:
+
+* ``search/docs.json``, the list of ``[url, title]`` pairs whose
+  positions serve as document numbers; and
+* one ``search/<prefix>.json`` shard per leading letters of the terms,
+  mapping each term to its postings as a flat list of alternating
+  document-number gaps and term counts, so ``[3, 2, 1, 5]`` means the
+  term appears twice in document 3 and five times in document 4.
+
+The script in ``_templates/layout.html`` fetches ``docs.json`` and the
+shards for a query's words only when the reader starts searching.
+publish.py runs this stage; run directly, it indexes ``docs/``:
+
+    bin/search_index.py
+
+"""
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from html.parser import HTMLParser
+
+SECTIONS = ('gang-of-four/', 'python/', 'fowler-refactoring/')
+SEARCH = 'search'
+PREFIX_LENGTH = 2
+WORD_RE = re.compile(r'[a-z0-9_]{2,}')
+
+class ArticleParser(HTMLParser):
+    """Collects a page's title and the text inside its <article>."""
+
+    def __init__(self):
+        super(ArticleParser, self).__init__()
+        self.title = []
+        self.text = []
+        self._in_title = False
+        self._article_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'article':
+            self._article_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'article':
+            self._article_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif self._article_depth:
+            self.text.append(data)
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+def shard_name(term, prefix_length=PREFIX_LENGTH):
+    return term[:prefix_length]
+
+def chapters(staged):
+    """Return (url, path) for each chapter page in a staged map."""
+    pages = []
+    for relative, path in sorted(staged.items()):
+        if relative.startswith(SECTIONS) and relative.endswith('index.html'):
+            pages.append(('/' + relative[:-len('index.html')], path))
+    return pages
+
+def build(pages, prefix_length=PREFIX_LENGTH):
+    """Return the document list and a dict of shards for `pages`."""
+    docs = []
+    postings = defaultdict(list)
+    for number, (url, path) in enumerate(pages):
+        parser = ArticleParser()
+        with open(path, encoding='utf-8') as f:
+            parser.feed(f.read())
+        docs.append([url, ''.join(parser.title).strip()])
+        for term, count in sorted(Counter(tokenize(' '.join(parser.text))
+                                          ).items()):
+            postings[term].append((number, count))
+
+    shards = defaultdict(dict)
+    for term, entries in sorted(postings.items()):
+        flat = []
+        previous = 0
+        for number, count in entries:
+            flat.extend((number - previous, count))
+            previous = number
+        shards[shard_name(term, prefix_length)][term] = flat
+    return docs, dict(shards)
+
+def decode(flat):
+    """Expand delta-encoded postings into (document, count) pairs."""
+    number = 0
+    for i in range(0, len(flat), 2):
+        number += flat[i]
+        yield number, flat[i + 1]
+
+def _dump(path, value):
+    data = json.dumps(value, separators=(',', ':'), sort_keys=True)
+    try:
+        with open(path) as f:
+            if f.read() == data:
+                return
+    except OSError:
+        pass
+    with open(path, 'w') as f:
+        f.write(data)
+
+def write_index(staged, out_dir, prefix_length=PREFIX_LENGTH):
+    """Write the index for a staged map; return its own staged entries."""
+    docs, shards = build(chapters(staged), prefix_length)
+    directory = os.path.join(out_dir, SEARCH)
+    os.makedirs(directory, exist_ok=True)
+    files = {'docs.json': docs}
+    files.update(('{}.json'.format(name), shard)
+                 for name, shard in shards.items())
+    for name in os.listdir(directory):
+        if name not in files:
+            os.remove(os.path.join(directory, name))
+    written = {}
+    for name, value in files.items():
+        path = os.path.join(directory, name)
+        _dump(path, value)
+        written[SEARCH + '/' + name] = path
+    return written
+
+if __name__ == '__main__':
+    import publish
+    staged = dict(publish._walk(publish.DOCS_DIR, ''))
+    written = write_index(staged, publish.BUILD_DIR)
+    size = sum(os.path.getsize(path) for path in written.values())
+    print('{} files, {:,} bytes, in {}'.format(
+        len(written), size, os.path.join(publish.BUILD_DIR, SEARCH)))
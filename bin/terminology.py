@@ -13,9 +13,15 @@ In Python PEPs, the opposite of “subclass” is almost always “base class”
 
 """
 import argparse
+import hashlib
+import mmap
 import os
 import re
+import sqlite3
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
 TERMS = (
     'superclass',
@@ -27,9 +33,290 @@ TERMS = (
     'child class',
 )
 
+WORD_RE = re.compile(r'\w+')
+BYTES_WORD_RE = re.compile(rb'\w+')
+
+def read_terms(path):
+    """Return the phrases listed one per line in a terms file."""
+    with open(path) as f:
+        lines = [line.split('#', 1)[0] for line in f]
+    return tuple(' '.join(WORD_RE.findall(line.lower()))
+                 for line in lines if WORD_RE.search(line))
+
+def longest_term(terms):
+    """Return how many words the longest of the `terms` contains."""
+    return max((len(WORD_RE.findall(term)) for term in terms), default=1)
+
+def compile_terms(terms):
+    """Compile a single regular expression that finds every term.
+
+    Each term is matched as a whole run of words, with any run of
+    non-word characters between them, followed by an optional
+    plural ``es``; this mirrors the old approach of splitting the text
+    into words and searching the space-joined result.  The match is a
+    lookahead, so it consumes nothing and every word start is tried,
+    even inside an earlier match.  At each start the longest term is
+    tried first, and terms_in_match() then finds the shorter terms
+    that also start there, so every term is counted independently of
+    the others.  A lookahead for the possible first letters lets the
+    regular expression engine skip most positions cheaply.
+
+    Each alternative is a group named after its term, which lets
+    terms_in_match() recover the terms from the pattern alone, even
+    in a worker process that received the pattern by pickling.
+
+    """
+    phrases = sorted({tuple(WORD_RE.findall(term.lower())) for term in terms},
+                     key=lambda words: (-len(' '.join(words)), words))
+    alternatives = ['(?P<{}>{}(?:es)?)'.format(
+        _group_name(words), r'\W+'.join(map(re.escape, words)))
+        for words in phrases if words]
+    initials = ''.join(sorted({re.escape(words[0][0])
+                               for words in phrases if words}))
+    return re.compile(r'(?=[' + initials + r'])\b(?=(?:'
+                      + '|'.join(alternatives) + r')\b)',
+                      re.IGNORECASE)
+
+def _group_name(words):
+    return 't' + ' '.join(words).encode('utf-8').hex()
+
+@lru_cache()
+def _pattern_terms(pattern):
+    return frozenset(bytes.fromhex(name[1:]).decode('utf-8')
+                     for name in pattern.groupindex)
+
+def terms_in_match(pattern, match):
+    """Return every term that starts where `match` does.
+
+    The match covers the longest term found there; any shorter term
+    at the same place matches the first few of its words.
+
+    """
+    terms = _pattern_terms(pattern)
+    text = match.group(match.lastgroup).lower()
+    if isinstance(text, bytes):
+        words = [w.decode('utf-8') for w in BYTES_WORD_RE.findall(text)]
+    else:
+        words = WORD_RE.findall(text)
+    found = []
+    for i in range(1, len(words) + 1):
+        phrase = ' '.join(words[:i])
+        if phrase in terms:
+            found.append(phrase)
+        if phrase.endswith('es') and phrase[:-2] in terms:
+            found.append(phrase[:-2])
+    return found
+
+def compile_bytes_terms(terms):
+    """Compile the terms into a pattern that searches UTF-8 bytes.
+
+    Bytes patterns only know ASCII, so letters outside ASCII act as word
+    separators and only ASCII letters in the terms match case-blind.
+
+    """
+    pattern = compile_terms(terms)
+    return re.compile(pattern.pattern.encode('utf-8'), pattern.flags
+                      & ~re.UNICODE)
+
+def count_text(pattern, text):
+    """Return a Counter of the terms that `pattern` finds in `text`."""
+    counts = Counter()
+    for match in pattern.finditer(text):
+        counts.update(terms_in_match(pattern, match))
+    return counts
+
+def count_stream(pattern, nwords, f, chunk_size):
+    """Count the terms in file `f`, reading `chunk_size` characters at a time.
+
+    A term of up to `nwords` words can straddle the edge of a chunk, so
+    each pass only accepts the matches that start before the last
+    `nwords` words of the buffer, and carries the rest of the buffer
+    over into the next pass.  The result is the same as calling
+    count_text() on the whole file.
+
+    """
+    counts = Counter()
+    buffer = ''
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        if not chunk:
+            counts.update(count_text(pattern, buffer))
+            return counts
+        cut = _carry_start(buffer, nwords)
+        if cut is None:
+            continue
+        end = 0
+        for match in pattern.finditer(buffer):
+            if match.start() >= cut:
+                break
+            counts.update(terms_in_match(pattern, match))
+        buffer = buffer[cut:]
+
+def _carry_start(buffer, nwords):
+    """Return where the last `nwords` words of `buffer` start, or None.
+
+    The final word might continue in the next chunk, so None is returned
+    unless at least one more word precedes those `nwords` words.
+
+    """
+    window = 256
+    while True:
+        start = max(0, len(buffer) - window)
+        starts = [m.start() for m in WORD_RE.finditer(buffer, start)]
+        if len(starts) > nwords:
+            return starts[-nwords]
+        if not start:
+            return None
+        window *= 4
+
+def count_mapped(pattern, path):
+    """Count the terms in a file by memory-mapping it.
+
+    The bytes `pattern` runs straight across the mapped pages, so the
+    only data copied out of the file are the matches themselves.
+
+    """
+    counts = Counter()
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return counts
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for match in pattern.finditer(m):
+                counts.update(terms_in_match(pattern, match))
+    return counts
+
+def count_file(pattern, nwords, path, chunk_size=None):
+    """Count the terms in the file at `path`.
+
+    A bytes `pattern`, as returned by compile_bytes_terms(), scans a
+    memory map of the file instead of reading it.
+
+    """
+    if isinstance(pattern.pattern, bytes):
+        return count_mapped(pattern, path)
+    with open(path) as f:
+        if chunk_size:
+            return count_stream(pattern, nwords, f, chunk_size)
+        return count_text(pattern, f.read())
+
+def map_files(pattern, nwords, paths, jobs=1, chunk_size=None):
+    """Generate the term counts of each file in `paths`, in order."""
+    count = partial(count_file, pattern, nwords, chunk_size=chunk_size)
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as executor:
+            yield from executor.map(count, paths, chunksize=16)
+    else:
+        yield from map(count, paths)
+
+def count_files(pattern, nwords, paths, jobs=1, chunk_size=None):
+    """Return the total term counts across every file in `paths`."""
+    counts = Counter()
+    for file_counts in map_files(pattern, nwords, paths, jobs, chunk_size):
+        counts.update(file_counts)
+    return counts
+
+CACHE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT);
+CREATE TABLE IF NOT EXISTS counts (path TEXT, term TEXT, n INTEGER);
+CREATE INDEX IF NOT EXISTS counts_path ON counts (path);
+'''
+
+def count_files_cached(cache_path, pattern, nwords, paths,
+                       jobs=1, chunk_size=None):
+    """Return the total term counts, rescanning only files that changed.
+
+    The sqlite database at `cache_path` remembers the size, mtime, and
+    content digest of every file alongside its term counts.  A file
+    whose size and mtime are unchanged is trusted without being read;
+    otherwise its digest decides whether it needs counting again.
+    Files that have disappeared are dropped from the cache, so their
+    counts no longer contribute to the totals.
+
+    """
+    db = sqlite3.connect(cache_path)
+    try:
+        with db:
+            db.executescript(CACHE_SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE key = 'pattern'"
+                             ).fetchone()
+            if row is None or row[0] != pattern.pattern:
+                db.execute('DELETE FROM files')
+                db.execute('DELETE FROM counts')
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('pattern', ?)",
+                           (pattern.pattern,))
+
+            known = {path: (size, mtime_ns, digest) for path, size, mtime_ns,
+                     digest in db.execute('SELECT * FROM files')}
+            changed = []
+            for path in paths:
+                st = os.stat(path)
+                old = known.pop(path, None)
+                if old and old[:2] == (st.st_size, st.st_mtime_ns):
+                    continue
+                digest = _digest(path)
+                if old and old[2] == digest:
+                    db.execute('UPDATE files SET size = ?, mtime_ns = ?'
+                               ' WHERE path = ?',
+                               (st.st_size, st.st_mtime_ns, path))
+                    continue
+                changed.append((path, st.st_size, st.st_mtime_ns, digest))
+
+            stale = list(known) + [path for path, *rest in changed]
+            for path in stale:
+                db.execute('DELETE FROM files WHERE path = ?', (path,))
+                db.execute('DELETE FROM counts WHERE path = ?', (path,))
+
+            changed_paths = [path for path, *rest in changed]
+            results = map_files(pattern, nwords, changed_paths,
+                                jobs, chunk_size)
+            for row, file_counts in zip(changed, results):
+                db.execute('INSERT INTO files VALUES (?, ?, ?, ?)', row)
+                db.executemany('INSERT INTO counts VALUES (?, ?, ?)',
+                               [(row[0], term, n)
+                                for term, n in file_counts.items()])
+
+            return Counter(dict(db.execute(
+                'SELECT term, SUM(n) FROM counts GROUP BY term')))
+    finally:
+        db.close()
+
+def _digest(path):
+    """Return a hex digest of the contents of the file at `path`."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(partial(f.read, 1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def find_files(root):
+    """Return the paths of the PEP text files beneath `root`."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.rst', '.txt')):
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
 def main(argv):
     parser = argparse.ArgumentParser(description='PEP terminology counts')
     parser.add_argument('pepsdir', help='path to PEPs repo')
+    parser.add_argument('--terms-file', metavar='PATH',
+                        help='count the phrases listed one per line in PATH'
+                        ' instead of the built-in terms')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='scan files in N worker processes')
+    parser.add_argument('--chunk-size', type=int, metavar='CHARS',
+                        help='read each file CHARS characters at a time'
+                        ' instead of all at once')
+    parser.add_argument('--mmap', action='store_true',
+                        help='memory-map each file and search its bytes'
+                        ' directly (terms must be ASCII)')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='keep per-file counts in the sqlite database'
+                        ' PATH and only rescan files that have changed')
 
     try:
         args = parser.parse_args(argv)
@@ -38,25 +325,23 @@ def main(argv):
               '\nhttps://github.com/python/peps.git', file=sys.stderr)
         raise
 
-    peps = []
-    for dirpath, dirnames, filenames in os.walk(args.pepsdir):
-        for filename in filenames:
-            if filename.endswith(('.rst', '.txt')):
-                peps.append(os.path.join(dirpath, filename))
-
-    counts = {term: 0 for term in TERMS}
-
-    for pep in peps:
-        with open(pep) as f:
-            content = f.read()
-        text = ' '.join(re.findall('\w+', content.lower()))
-        #text = ' '.join(content.lower().replace('.'), ' ').split())
-        for term in TERMS:
-            n = text.count(' ' + term + ' ')
-            m = text.count(' ' + term + 'es ')
-            counts[term] += n + m
+    terms = read_terms(args.terms_file) if args.terms_file else TERMS
+    if not terms:
+        parser.error('{} lists no terms'.format(args.terms_file))
+    if args.mmap:
+        pattern = compile_bytes_terms(terms)
+    else:
+        pattern = compile_terms(terms)
+    peps = find_files(args.pepsdir)
+    nwords = longest_term(terms)
+    if args.cache:
+        counts = count_files_cached(args.cache, pattern, nwords, peps,
+                                    args.jobs, args.chunk_size)
+    else:
+        counts = count_files(pattern, nwords, peps,
+                             args.jobs, args.chunk_size)
 
-    for term in sorted(TERMS):
+    for term in sorted(terms):
         print('{:5}  {}'.format(counts[term], term))
 
 if __name__ == '__main__':
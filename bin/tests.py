@@ -0,0 +1,530 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+import zlib
+import unittest
+
+from . import (devserver, parallel_tests, postbuild, publish, search_index,
+               terminology)
+
+# Importing parallel_tests put the repository root on sys.path.
+import better_doctest
+
+SAMPLE = '''\
+Subclasses of a base class -- or of a base
+class split across lines -- are sometimes called derived classes,
+and a superclass is sometimes written "super class".  Parent
+   class, child-class, subclass subclass subclassing.
+'''
+
+class TerminologyTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.paths = []
+        for i in range(12):
+            path = os.path.join(self.tempdir.name, 'pep-{:04}.txt'.format(i))
+            with open(path, 'w') as f:
+                f.write(SAMPLE * (i + 1))
+            self.paths.append(path)
+        self.pattern = terminology.compile_terms(terminology.TERMS)
+        self.nwords = terminology.longest_term(terminology.TERMS)
+
+    def serial_counts(self):
+        return terminology.count_files(self.pattern, self.nwords, self.paths)
+
+    def test_counts(self):
+        counts = terminology.count_text(self.pattern, SAMPLE)
+        self.assertEqual(counts, {
+            'base class': 2,
+            'child class': 1,
+            'derived class': 1,
+            'parent class': 1,
+            'subclass': 3,
+            'super class': 1,
+            'superclass': 1,
+        })
+
+    def test_nested_and_overlapping_terms(self):
+        text = 'The base class hierarchy, and another class; base classes.'
+        terms = ['class', 'base class', 'class hierarchy']
+        expected = {'class': 3, 'base class': 2, 'class hierarchy': 1}
+        pattern = terminology.compile_terms(terms)
+        self.assertEqual(terminology.count_text(pattern, text), expected)
+        for chunk_size in 1, 5, 4096:
+            counts = terminology.count_stream(pattern, 2, io.StringIO(text),
+                                              chunk_size)
+            self.assertEqual(counts, expected, chunk_size)
+        pattern = terminology.compile_bytes_terms(terms)
+        with open(self.paths[0], 'w') as f:
+            f.write(text)
+        self.assertEqual(terminology.count_mapped(pattern, self.paths[0]),
+                         expected)
+
+    def test_streaming_matches_serial(self):
+        expected = self.serial_counts()
+        for chunk_size in 1, 2, 3, 7, 64, 4096:
+            counts = terminology.count_files(
+                self.pattern, self.nwords, self.paths, chunk_size=chunk_size)
+            self.assertEqual(counts, expected, chunk_size)
+
+    def test_jobs_match_serial(self):
+        expected = self.serial_counts()
+        counts = terminology.count_files(
+            self.pattern, self.nwords, self.paths, jobs=3)
+        self.assertEqual(counts, expected)
+        counts = terminology.count_files(
+            self.pattern, self.nwords, self.paths, jobs=3, chunk_size=5)
+        self.assertEqual(counts, expected)
+
+    def test_cache_follows_changes(self):
+        cache = os.path.join(self.tempdir.name, 'cache.sqlite')
+
+        def cached_counts():
+            return terminology.count_files_cached(
+                cache, self.pattern, self.nwords, self.paths)
+
+        self.assertEqual(cached_counts(), self.serial_counts())
+        self.assertEqual(cached_counts(), self.serial_counts())
+
+        with open(self.paths[0], 'a') as f:
+            f.write('One more subclass, and a longer file.\n')
+        os.remove(self.paths.pop())
+        self.assertEqual(cached_counts(), self.serial_counts())
+
+        other = terminology.compile_terms(['subclass'])
+        counts = terminology.count_files_cached(
+            cache, other, 1, self.paths)
+        self.assertEqual(set(counts), {'subclass'})
+
+    def test_mmap_matches_serial(self):
+        pattern = terminology.compile_bytes_terms(terminology.TERMS)
+        counts = terminology.count_files(pattern, self.nwords, self.paths)
+        self.assertEqual(counts, self.serial_counts())
+
+    def test_empty_terms_file_is_refused(self):
+        path = os.path.join(self.tempdir.name, 'terms.txt')
+        with open(path, 'w') as f:
+            f.write('# nothing but a comment\n\n')
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, \
+                self.assertRaises(SystemExit):
+            terminology.main([self.tempdir.name, '--terms-file', path])
+        self.assertIn('lists no terms', stderr.getvalue())
+
+DOCUMENT = """\
+Some prose, and an illustration that is not tested::
+
+   >>> print('not run')
+   surprise
+
+.. testsetup::
+
+   import os
+
+.. testcode::
+   :hide:
+
+   print(os.sep)
+
+.. testoutput::
+   :options: +NORMALIZE_WHITESPACE
+
+   /
+
+>>> x = 1
+>>> x + 1
+2
+
+.. testcode:: other
+
+   print('other')
+
+.. code-block:: python
+
+   >>> print('not run either')
+"""
+
+class ParallelTestsTests(unittest.TestCase):
+    def test_parse_groups(self):
+        default, other = parallel_tests.parse_groups(DOCUMENT)
+        self.assertEqual((default.name, other.name), ('default', 'other'))
+        self.assertEqual([b.code for b in default.setup], ['import os\n'])
+        (code, output), (doctest_block,) = default.tests
+        self.assertEqual(code.code, 'print(os.sep)\n')
+        self.assertEqual(output.code, '/\n')
+        self.assertEqual(output.options,
+                         {parallel_tests.doctest.NORMALIZE_WHITESPACE: True})
+        self.assertEqual(doctest_block.lineno, 20)
+        self.assertEqual(other.tests[0][0].code, "print('other')\n")
+
+    def test_admonition_bodies_are_parsed(self):
+        blocks = parallel_tests.parse_blocks(
+            '.. note::\n\n   >>> 1 + 1\n   2\n\n'
+            '.. code-block:: python\n\n   >>> 1 + 2\n   0\n')
+        self.assertEqual([b.code for b in blocks], ['>>> 1 + 1\n2\n'])
+
+    def test_run_document(self):
+        path = os.path.join(tempfile.mkdtemp(), 'index.rst')
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        self.addCleanup(os.remove, path)
+        with open(path, 'w') as f:
+            f.write(DOCUMENT.replace("other')", "other')\n   print(x)"))
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        failures, tries, report = parallel_tests.run_document(path)
+        self.assertEqual((failures, tries), (1, 5))
+        self.assertIn("NameError: name 'x' is not defined", report)
+
+    def test_checker_normalizes_addresses(self):
+        check = parallel_tests.BetterOutputChecker().check_output
+        self.assertTrue(check('<a at 0x7f1>\n', '<a at 0x7f1>\n', 0))
+        self.assertTrue(check('<a at 0x7f1>\n', '<a at 0x10ab>\n', 0))
+        self.assertFalse(check('<a at 0x7f1>\n', '<b at 0x10ab>\n', 0))
+        self.assertTrue(check('<a at 0x...>\n', '<a at 0x10ab>\n',
+                              parallel_tests.doctest.ELLIPSIS))
+
+    def test_extension_waits_for_doctest_builder(self):
+        class App(object):
+            def connect(self, event, callback):
+                self.callback = (event, callback)
+
+        # Any Sphinx application, like the one DevserverTests builds,
+        # imports the extension too, so take it out while we check.
+        module = sys.modules.pop('sphinx.ext.doctest', None)
+        if module is not None:
+            self.addCleanup(sys.modules.__setitem__, 'sphinx.ext.doctest',
+                            module)
+        app = App()
+        better_doctest.setup(app)
+        event, callback = app.callback
+        self.assertEqual(event, 'builder-inited')
+        app.builder = App()
+        for app.builder.name in 'html', 'dirhtml', 'linkcheck':
+            callback(app)
+        self.assertNotIn('sphinx.ext.doctest', sys.modules)
+
+class PublishTests(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.root = tempdir.name
+        self.docs = os.path.join(self.root, 'docs')
+        self.manifest = os.path.join(self.root, 'manifest.json')
+        self.staged = {}
+        for relative in 'index.html', 'python/index.html', '_static/a.css':
+            self.staged[relative] = self.write('build/' + relative, relative)
+        for relative in 'CNAME', 'old/index.html', 'index.html':
+            self.write('docs/' + relative, 'stale')
+
+    def write(self, relative, content):
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def publish(self):
+        return publish.publish(self.staged, self.docs, self.manifest)
+
+    def test_publish(self):
+        copied, deleted, unchanged, hashed = self.publish()
+        self.assertEqual(copied, ['_static/a.css', 'index.html',
+                                  'python/index.html'])
+        self.assertEqual(deleted, ['old/index.html'])
+        self.assertEqual(sorted(os.listdir(self.docs)),
+                         ['CNAME', '_static', 'index.html', 'python'])
+
+        copied, deleted, unchanged, hashed = self.publish()
+        self.assertEqual((copied, deleted, len(unchanged), hashed),
+                         ([], [], 3, 0))
+
+        self.write('build/python/index.html', 'new content')
+        copied, deleted, unchanged, hashed = self.publish()
+        self.assertEqual(copied, ['python/index.html'])
+        with open(os.path.join(self.docs, 'python/index.html')) as f:
+            self.assertEqual(f.read(), 'new content')
+
+    def test_dry_run(self):
+        copied, deleted, unchanged, hashed = publish.publish(
+            self.staged, self.docs, self.manifest, dry_run=True)
+        self.assertEqual(len(copied), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'old')))
+        self.assertFalse(os.path.exists(self.manifest))
+
+def png(pixels, chunk_size):
+    # A grayscale PNG whose image data is split across several IDATs.
+    width = len(pixels[0])
+    raw = b''.join(b'\0' + bytes(row) for row in pixels)
+    idat = zlib.compress(raw, 1)
+    chunks = [(b'IHDR', struct.pack('>IIBBBBB', width, len(pixels),
+                                    8, 0, 0, 0, 0))]
+    chunks += [(b'IDAT', idat[i:i + chunk_size])
+               for i in range(0, len(idat), chunk_size)]
+    chunks.append((b'IEND', b''))
+    return postbuild.PNG_SIGNATURE + b''.join(
+        struct.pack('>I4s', len(body), kind) + body
+        + struct.pack('>I', zlib.crc32(kind + body)) for kind, body in chunks)
+
+def png_chunks(data):
+    position = 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += length + 12
+
+class PostbuildTests(unittest.TestCase):
+    def test_optimize_png_is_lossless(self):
+        original = png([[(x * y) % 7 for x in range(200)]
+                        for y in range(100)], 50)
+        optimized = postbuild.optimize_png(original)
+        self.assertLess(len(optimized), len(original))
+        kinds = [kind for kind, body in png_chunks(optimized)]
+        self.assertEqual(kinds, [b'IHDR', b'IDAT', b'IEND'])
+
+        def pixels(data):
+            return zlib.decompress(b''.join(
+                body for kind, body in png_chunks(data) if kind == b'IDAT'))
+
+        self.assertEqual(pixels(optimized), pixels(original))
+
+    def test_process(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        files = {
+            '_static/style.css': "@font-face { src: url('font.woff'); }",
+            '_static/font.woff': 'not really a font',
+            'a/index.html': '<link href="../_static/style.css">'
+                            '<link href="/_static/style.css">'
+                            '<link href="https://example.com/_static/'
+                            'style.css">'
+                            + '<p>text</p>' * 100,
+        }
+        staged = {}
+        for relative, content in files.items():
+            path = os.path.join(tempdir.name, 'build', relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+            staged[relative] = path
+        stage_dir = os.path.join(tempdir.name, 'stage')
+        new_staged, report = postbuild.process(staged, stage_dir)
+
+        css, = [r for r in new_staged if r.endswith('.css')]
+        font, = [r for r in new_staged if r.endswith('.woff')]
+        self.assertRegex(css, r'^_static/style\.[0-9a-f]{8}\.css$')
+        with open(new_staged[css]) as f:
+            self.assertIn("url('{}')".format(os.path.basename(font)),
+                          f.read())
+        with open(new_staged['a/index.html']) as f:
+            html = f.read()
+        self.assertIn('href="../{}"'.format(css), html)
+        self.assertIn('href="/{}"'.format(css), html)
+        self.assertIn('href="https://example.com/_static/style.css"', html)
+        self.assertIn('a/index.html.gz', new_staged)
+        self.assertEqual(len(report), 3)
+
+    def test_process_skips_unchanged_files(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+
+        def write(relative, content):
+            path = os.path.join(tempdir.name, 'build', relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+            os.utime(path, ns=(0, time.time_ns() + 10 ** 9))
+            return path
+
+        staged = {relative: write(relative, relative * 100) for relative in
+                  ('a/index.html', 'b/index.html', 'notes.txt')}
+        staged['_static/style.css'] = write('_static/style.css', 'p {}')
+        stage_dir = os.path.join(tempdir.name, 'stage')
+        digests = publish.Digests()
+        postbuild.process(staged, stage_dir, digests)
+
+        # Outputs that are reprocessed lose this marker.
+        def mark(relative):
+            with open(os.path.join(stage_dir, relative), 'w') as f:
+                f.write('marker')
+
+        def marked():
+            return sorted(relative for relative in staged
+                          if not relative.startswith('_static/')
+                          and postbuild._read(os.path.join(
+                              stage_dir, relative)) == b'marker')
+
+        for relative in 'a/index.html', 'b/index.html', 'notes.txt':
+            mark(relative)
+        write('a/index.html', 'a new page')
+        new_staged, report = postbuild.process(staged, stage_dir, digests)
+        self.assertEqual(marked(), ['b/index.html', 'notes.txt'])
+        self.assertEqual(len(report), 4)
+        self.assertIn('b/index.html.gz', new_staged)
+
+        # A new fingerprint means every page must be rewritten.
+        write('_static/style.css', 'p { margin: 0 }')
+        postbuild.process(staged, stage_dir, digests)
+        self.assertEqual(marked(), ['notes.txt'])
+        with open(os.path.join(stage_dir, 'b/index.html')) as f:
+            self.assertEqual(f.read(), 'b/index.html' * 100)
+
+class DevserverTests(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.root = tempdir.name
+        os.makedirs(os.path.join(self.root, 'chapter'))
+        with open(os.path.join(self.root, 'chapter', 'index.html'), 'w') as f:
+            f.write('<html><body>Chapter</body></html>')
+
+    def test_websocket_handshake_values(self):
+        # The example from RFC 6455, section 1.3.
+        accept = devserver.websocket_accept('dGhlIHNhbXBsZSBub25jZQ==')
+        self.assertEqual(accept, 's3pPLMBiTxaQ9kYGzzhZRbK+xOo=')
+        self.assertEqual(devserver.websocket_frame('reload'),
+                         b'\x81\x06reload')
+
+    def test_chapters(self):
+        root = devserver.ROOT
+        iterator = os.path.join(root, 'gang-of-four', 'iterator')
+        self.assertEqual(devserver.chapters({
+            os.path.join(iterator, 'email.txt'),
+            os.path.join(root, '_static', 'style.css'),
+            os.path.join(root, 'index.rst'),
+        }), [os.path.join(root, 'gang-of-four', 'iterator', 'index.rst'),
+             os.path.join(root, 'index.rst')])
+
+    def test_rebuild(self):
+        try:
+            import sphinx.application
+        except ImportError:
+            self.skipTest('Sphinx is not installed')
+
+        def write(relative, content):
+            path = os.path.join(self.root, relative)
+            with open(path, 'w') as f:
+                f.write(content)
+            os.utime(path, ns=(0, time.time_ns() + 10 ** 9))
+            return path
+
+        def page():
+            with open(os.path.join(out_dir, 'chapter', 'index.html')) as f:
+                return f.read()
+
+        write('conf.py', "project = 'First'\n")
+        write('index.rst',
+              'Home\n====\n\n.. toctree::\n\n   chapter/index\n')
+        chapter = write('chapter/index.rst', 'Chapter\n=======\n\n'
+                        '.. literalinclude:: example.py\n')
+        example = write('chapter/example.py', 'print("one")\n')
+        out_dir = os.path.join(self.root, '_build', 'dirhtml')
+        builder = devserver.Builder(
+            out_dir, self.root, os.path.join(self.root, '_build', 'doctrees'),
+            status=None, warning=None)
+        self.assertIn('one', page())
+
+        # A changed example rebuilds the chapter that includes it.
+        write('chapter/example.py', 'print("two")\n')
+        self.assertEqual(builder.rebuild({example}), [chapter])
+        self.assertIn('two', page())
+
+        # A changed conf.py needs a new application to be read at all.
+        app = builder.app
+        conf = write('conf.py', "project = 'Second'\n"
+                     "def fail(app, docname, source):\n"
+                     "    if 'FAIL' in source[0]:\n"
+                     "        raise RuntimeError('a broken chapter')\n"
+                     "def setup(app):\n"
+                     "    app.connect('source-read', fail)\n")
+        builder.rebuild({conf})
+        self.assertIsNot(builder.app, app)
+        self.assertIn('Second', page())
+
+        # After a failed build, the next change starts over.
+        write('chapter/index.rst', 'Chapter\n=======\n\nFAIL\n')
+        self.assertRaises(Exception, builder.rebuild, {chapter})
+        self.assertIsNone(builder.app)
+        write('chapter/index.rst', 'Chapter\n=======\n\nFixed.\n')
+        self.assertEqual(builder.rebuild({chapter}), [chapter])
+        self.assertIn('Fixed.', page())
+
+    def test_watchers(self):
+        path = os.path.join(self.root, 'chapter', 'index.rst')
+        for watcher in (devserver.make_watcher(self.root),
+                        devserver.PollingWatcher(self.root, interval=0.01)):
+            self.addCleanup(watcher.close)
+            with open(path, 'a') as f:
+                f.write('More text.\n')
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+            self.assertIn(path, watcher.changes(5))
+
+    def test_serve_and_reload(self):
+        site = devserver.MemorySite(self.root)
+        server = devserver.serve(site, 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        address = server.server_address
+
+        with socket.create_connection(address) as sock:
+            sock.sendall(b'GET /chapter/ HTTP/1.0\r\n\r\n')
+            response = b''.join(iter(lambda: sock.recv(65536), b''))
+        self.assertIn(b'200 OK', response)
+        self.assertIn(devserver.RELOAD_SCRIPT + b'</body>', response)
+
+        with socket.create_connection(address) as sock:
+            sock.sendall(b'GET /_reload HTTP/1.1\r\n'
+                         b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                         b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n'
+                         b'Sec-WebSocket-Version: 13\r\n\r\n')
+            response = b''
+            while not response.endswith(b'\r\n\r\n'):
+                response += sock.recv(1)
+            self.assertIn(b'101', response)
+            for i in range(100):
+                if devserver.Handler.sockets:
+                    break
+                time.sleep(0.01)
+            devserver.broadcast('reload')
+            self.assertEqual(sock.recv(8), b'\x81\x06reload')
+
+class SearchIndexTests(unittest.TestCase):
+    def test_write_index(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        pages = {
+            'python/a/index.html': 'Subclass and subclass again.',
+            'python/b/index.html': 'No match here, apart from base.',
+            'gang-of-four/c/index.html': 'A subclass of a base class.',
+            '_static/x/index.html': 'subclass',
+        }
+        staged = {}
+        for relative, text in pages.items():
+            path = os.path.join(tempdir.name, relative.replace('/', '_'))
+            with open(path, 'w') as f:
+                f.write('<title>{0}</title><article><p>{1}</p></article>'
+                        '<p>footer subclass</p>'.format(relative, text))
+            staged[relative] = path
+        out_dir = os.path.join(tempdir.name, 'out')
+        os.makedirs(os.path.join(out_dir, 'search'))
+        open(os.path.join(out_dir, 'search', 'zz.json'), 'w').close()
+
+        written = search_index.write_index(staged, out_dir)
+        self.assertNotIn('search/zz.json', written)
+        self.assertFalse(os.path.exists(
+            os.path.join(out_dir, 'search', 'zz.json')))
+        with open(written['search/docs.json']) as f:
+            docs = json.load(f)
+        self.assertEqual([url for url, title in docs],
+                         ['/gang-of-four/c/', '/python/a/', '/python/b/'])
+        with open(written['search/su.json']) as f:
+            shard = json.load(f)
+        self.assertEqual(list(search_index.decode(shard['subclass'])),
+                         [(0, 1), (1, 2)])
+        with open(written['search/ba.json']) as f:
+            self.assertEqual(json.load(f)['base'], [0, 1, 2, 1])
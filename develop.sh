@@ -1,3 +1,3 @@
 #!/bin/bash
 
-,watch make dirhtml doctest -- $(find -name '*.rst') */*.css _templates/*.html
+exec python3 bin/devserver.py "$@"
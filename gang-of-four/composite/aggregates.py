@@ -0,0 +1,100 @@
+# A composite that remembers facts about each subtree.  Asking how
+# many widgets a window holds, or how deeply they nest, normally means
+# walking every child; here each node caches the answers for its own
+# subtree, and a change repairs only the caches along its path upward.
+
+from collections import Counter
+
+class Component(object):
+    """A node in a composite tree that caches aggregates of its subtree.
+
+    ``size`` counts the nodes in the subtree and ``height`` is the
+    length of its longest downward path, so a lone leaf has size 1 and
+    height 0.  Subclasses can list further aggregates in `reducers`,
+    mapping each name to a pair ``(value, combine)``: ``value(node)``
+    returns the node's own contribution, and ``combine()`` reduces an
+    iterable of the node's value and its children's aggregates, as
+    ``sum`` or ``max`` would.
+
+    Adding or removing a child costs O(depth) for ``size`` and
+    ``height`` and O(depth x fan-out) for custom reducers, stopping as
+    soon as an ancestor's aggregates come out unchanged; every query is
+    a plain attribute read.
+
+    """
+    reducers = {}
+
+    def __init__(self):
+        self.parent = None
+        self._children = []
+        self._child_heights = Counter()
+        self.size = 1
+        self.height = 0
+        self.aggregates = {name: combine([value(self)])
+                           for name, (value, combine)
+                           in self.reducers.items()}
+
+    @property
+    def children(self):
+        return tuple(self._children)
+
+    def add(self, child):
+        if child.parent is not None:
+            raise ValueError('{!r} already has a parent'.format(child))
+        node = self
+        while node is not None:
+            if node is child:
+                raise ValueError('cannot add {!r} beneath itself'
+                                 .format(child))
+            node = node.parent
+        child.parent = self
+        self._children.append(child)
+        self._child_heights[child.height] += 1
+        self._update(child.size)
+
+    def remove(self, child):
+        self._children.remove(child)
+        child.parent = None
+        self._child_heights[child.height] -= 1
+        if not self._child_heights[child.height]:
+            del self._child_heights[child.height]
+        self._update(-child.size)
+
+    def refresh(self):
+        """Recompute custom aggregates after this node's own value changes."""
+        self._update(0)
+
+    def _update(self, delta):
+        # Walk up toward the root adding `delta` to each size, and
+        # while heights keep changing, move each node's entry in its
+        # parent's histogram of child heights.
+        node = self
+        heights_changed = True
+        values_changed = bool(self.reducers)
+        while node is not None:
+            node.size += delta
+            if heights_changed:
+                height = max(node._child_heights) + 1 \
+                    if node._child_heights else 0
+                heights_changed = height != node.height
+                old_height, node.height = node.height, height
+            if values_changed and node.reducers:
+                values_changed = node._reduce()
+            parent = node.parent
+            if parent is not None and heights_changed:
+                parent._child_heights[old_height] -= 1
+                if not parent._child_heights[old_height]:
+                    del parent._child_heights[old_height]
+                parent._child_heights[node.height] += 1
+            if not (delta or heights_changed or values_changed):
+                break
+            node = parent
+
+    def _reduce(self):
+        aggregates = {}
+        for name, (value, combine) in self.reducers.items():
+            aggregates[name] = combine(
+                [value(self)] + [c.aggregates[name] for c in self._children])
+        changed = aggregates != self.aggregates
+        self.aggregates = aggregates
+        return changed
@@ -0,0 +1,68 @@
+# Compare cached aggregates against walking the whole tree for every
+# query.  Run directly:
+#
+#     python3 gang-of-four/composite/benchmarks.py
+
+import random
+from timeit import timeit
+
+from aggregates import Component
+from tree import walk
+
+SIZES = 1000, 10000, 100000
+QUERIES = 100
+
+class Widget(Component):
+    reducers = {'area': (lambda w: w.area, sum)}
+
+    def __init__(self, area):
+        self.area = area
+        super(Widget, self).__init__()
+
+def children(widget):
+    return widget.children
+
+def build(n, rng):
+    root = Widget(1)
+    nodes = [root]
+    for i in range(n - 1):
+        widget = Widget(rng.randrange(1, 100))
+        rng.choice(nodes).add(widget)
+        nodes.append(widget)
+    return root, nodes
+
+def full_walk(root):
+    size = height = area = 0
+    for depth, widget in walk(root, children):
+        size += 1
+        height = max(height, depth)
+        area += widget.area
+    return size, height, area
+
+def cached(root):
+    return root.size, root.height, root.aggregates['area']
+
+def best(function, number):
+    return min(timeit(function, number=number) for i in range(3)) / number
+
+def bench_aggregates():
+    print('{:>8} {:>14} {:>14} {:>14}'.format(
+        'nodes', 'walk query', 'cached query', 'add + remove'))
+    for n in SIZES:
+        rng = random.Random(n)
+        root, nodes = build(n, rng)
+        assert full_walk(root) == cached(root)
+        walked = best(lambda: full_walk(root), max(1, QUERIES * 1000 // n))
+        read = best(lambda: cached(root), QUERIES * 1000)
+
+        def edit():
+            widget = Widget(1)
+            rng.choice(nodes).add(widget)
+            widget.parent.remove(widget)
+
+        edited = best(edit, QUERIES * 10)
+        print('{:>8} {:>12.2f}us {:>12.2f}us {:>12.2f}us'.format(
+            n, walked * 1e6, read * 1e6, edited * 1e6))
+
+if __name__ == '__main__':
+    bench_aggregates()
@@ -0,0 +1,166 @@
+import io
+import random
+import sys
+import unittest
+
+from . import aggregates, tree
+
+class Node(object):
+    def __init__(self, name, children=()):
+        self.name = name
+        self.children = list(children)
+
+    def __repr__(self):
+        return '<Node {}>'.format(self.name)
+
+def get_children(node):
+    return node.children
+
+def print_tree(widget, indent=0):
+    # The recursive routine from tk_example.py, for comparison.
+    print('{:<{}} * {!r}'.format('', indent * 4, widget))
+    for child in widget.children:
+        print_tree(child, indent + 1)
+
+class TreeTests(unittest.TestCase):
+    def setUp(self):
+        self.root = Node('root', [
+            Node('a', [Node('a1'), Node('a2', [Node('a2x')])]),
+            Node('b'),
+            Node('c', [Node('c1')]),
+        ])
+
+    def test_depth_first_order(self):
+        self.assertEqual(
+            [(depth, node.name)
+             for depth, node in tree.walk(self.root, get_children)],
+            [(0, 'root'), (1, 'a'), (2, 'a1'), (2, 'a2'), (3, 'a2x'),
+             (1, 'b'), (1, 'c'), (2, 'c1')])
+
+    def test_breadth_first_order(self):
+        self.assertEqual(
+            [(depth, node.name) for depth, node
+             in tree.walk(self.root, get_children, breadth_first=True)],
+            [(0, 'root'), (1, 'a'), (1, 'b'), (1, 'c'), (2, 'a1'),
+             (2, 'a2'), (2, 'c1'), (3, 'a2x')])
+
+    def test_render_matches_print_tree(self):
+        expected = io.StringIO()
+        stdout = sys.stdout
+        sys.stdout = expected
+        try:
+            print_tree(self.root)
+        finally:
+            sys.stdout = stdout
+
+        writes = []
+        output = io.StringIO()
+        output.write = lambda s: writes.append(s) or len(s)
+        tree.render_tree(self.root, get_children, output)
+        self.assertEqual(writes, [expected.getvalue()])
+
+    # Synthetic million-node trees, whose nodes are just the integers
+    # 0 through N - 1 and whose children are computed on demand.
+
+    N = 1000000
+
+    def test_million_node_wide_tree(self):
+        def children(i):
+            return range(1000 * i + 1, min(1000 * i + 1001, self.N))
+
+        for breadth_first in False, True:
+            n = 0
+            for depth, node in tree.walk(0, children, breadth_first):
+                n += 1
+            self.assertEqual(n, self.N)
+
+        output = io.StringIO()
+        tree.render_tree(0, children, output)
+        self.assertEqual(output.getvalue().count('\n'), self.N)
+
+    def test_million_node_deep_tree(self):
+        def children(i):
+            return (i + 1,) if i + 1 < self.N else ()
+
+        self.assertGreater(self.N, sys.getrecursionlimit())
+        depth, node = max(tree.walk(0, children))
+        self.assertEqual((depth, node), (self.N - 1, self.N - 1))
+
+class Widget(aggregates.Component):
+    reducers = {'area': (lambda w: w.area, sum),
+                'widest': (lambda w: w.width, max)}
+
+    def __init__(self, width, height):
+        self.width = width
+        self.area = width * height
+        super(Widget, self).__init__()
+
+def full_walk(root):
+    size = height = area = widest = 0
+    for depth, w in tree.walk(root, get_children):
+        size += 1
+        height = max(height, depth)
+        area += w.area
+        widest = max(widest, w.width)
+    return size, height, {'area': area, 'widest': widest}
+
+class AggregateTests(unittest.TestCase):
+    def assertAggregates(self, root):
+        self.assertEqual((root.size, root.height, root.aggregates),
+                         full_walk(root))
+
+    def test_leaf(self):
+        w = Widget(3, 4)
+        self.assertEqual((w.size, w.height), (1, 0))
+        self.assertEqual(w.aggregates, {'area': 12, 'widest': 3})
+
+    def test_add_and_remove(self):
+        root, frame, button = Widget(10, 10), Widget(5, 5), Widget(20, 1)
+        root.add(frame)
+        frame.add(button)
+        self.assertEqual((root.size, root.height), (3, 2))
+        self.assertEqual(root.aggregates, {'area': 145, 'widest': 20})
+        frame.remove(button)
+        self.assertEqual((root.size, root.height), (2, 1))
+        self.assertEqual(root.aggregates, {'area': 125, 'widest': 10})
+        self.assertIsNone(button.parent)
+
+    def test_second_parent_is_refused(self):
+        a, b, c = Widget(1, 1), Widget(1, 1), Widget(1, 1)
+        a.add(c)
+        self.assertRaises(ValueError, b.add, c)
+
+    def test_cycles_are_refused(self):
+        a, b, c = Widget(1, 1), Widget(1, 1), Widget(1, 1)
+        a.add(b)
+        b.add(c)
+        self.assertRaises(ValueError, a.add, a)
+        self.assertRaises(ValueError, c.add, a)
+        self.assertEqual(a.children, (b,))
+        self.assertEqual((a.size, a.height), (3, 2))
+
+    def test_refresh(self):
+        root, child = Widget(1, 1), Widget(2, 2)
+        root.add(child)
+        child.area = 100
+        child.refresh()
+        self.assertEqual(root.aggregates['area'], 101)
+
+    def test_random_edits_match_full_walk(self):
+        rng = random.Random(8)
+        root = Widget(1, 1)
+        nodes = [root]
+        for i in range(2000):
+            if rng.random() < 0.3 and len(nodes) > 1:
+                node = rng.choice(nodes[1:])
+                node.parent.remove(node)
+                detached = {n for d, n in tree.walk(node, get_children)}
+                nodes = [n for n in nodes if n not in detached]
+            else:
+                node = Widget(rng.randrange(1, 50), rng.randrange(1, 50))
+                rng.choice(nodes).add(node)
+                nodes.append(node)
+            if i % 100 == 0:
+                for node in nodes:
+                    self.assertAggregates(node)
+        self.assertAggregates(root)
@@ -0,0 +1,45 @@
+# Walking a composite without recursion.  print_tree() in tk_example.py
+# recurses once per widget, so a deep enough tree exhausts the Python
+# stack; here an explicit stack of child iterators takes its place.
+
+def walk(root, children, breadth_first=False):
+    """Generate a (depth, node) pair for every node beneath `root`.
+
+    `children` is called with each node and returns its children, as
+    ``lambda widget: widget.winfo_children()`` does for Tk widgets.
+    Nodes arrive depth first, in the same order that print_tree()
+    visits them, unless `breadth_first` is true.
+
+    """
+    if breadth_first:
+        depth = 0
+        level = [root]
+        while level:
+            next_level = []
+            for node in level:
+                yield depth, node
+                next_level.extend(children(node))
+            level = next_level
+            depth += 1
+        return
+
+    yield 0, root
+    stack = [iter(children(root))]
+    while stack:
+        for child in stack[-1]:
+            yield len(stack), child
+            stack.append(iter(children(child)))
+            break
+        else:
+            stack.pop()
+
+def render_tree(root, children, file):
+    """Write the tree to `file` in print_tree() format, in a single write."""
+    indents = []
+    lines = []
+    for depth, node in walk(root, children):
+        while len(indents) <= depth:
+            indents.append(' ' * (4 * len(indents)) + ' * ')
+        lines.append(indents[depth] + repr(node))
+    lines.append('')
+    file.write('\n'.join(lines))
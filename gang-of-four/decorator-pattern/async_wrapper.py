@@ -0,0 +1,95 @@
+# Decorator Pattern for asyncio streams.  A logging call that blocks
+# on a slow handler would stall every task on the event loop, so the
+# records are handed through a queue to a listener thread instead.
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+class WriteLoggingStream(object):
+    def __init__(self, writer, logger):
+        self._writer = writer
+        self._logger = logger
+        # Any object with StreamWriter's write methods will do; only
+        # a real one can say which socket it writes to.
+        get_extra_info = getattr(writer, 'get_extra_info', None)
+        peer = None
+        if get_extra_info is not None:
+            peer = get_extra_info('peername') or get_extra_info('sockname')
+        self._peer = str(peer) if peer else repr(writer)
+
+    # The two methods we actually want to specialize,
+    # to log each occasion on which data is written.
+
+    def write(self, data):
+        self._writer.write(data)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('wrote %s bytes to %s', len(data), self._peer)
+
+    def writelines(self, data):
+        data = list(data)
+        self._writer.writelines(data)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('wrote %s bytes to %s',
+                               sum(len(d) for d in data), self._peer)
+
+    # The rest of the StreamWriter interface, passed straight through.
+
+    async def drain(self):
+        await self._writer.drain()
+
+    def close(self):
+        self._writer.close()
+
+    async def wait_closed(self):
+        await self._writer.wait_closed()
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['_writer'], name)
+
+class RawQueueHandler(QueueHandler):
+    """Enqueue records untouched, leaving all formatting to the listener.
+
+    The standard QueueHandler formats each message before enqueueing
+    it; that is safe, but it is work that need not happen on the loop.
+    The catch is that a record's message is then built on the listener
+    thread, from whatever its arguments hold by that time.  The ints
+    and strings that WriteLoggingStream logs cannot change, but a
+    logger whose callers pass mutable arguments, like a list they go
+    on to modify, needs the standard QueueHandler instead.
+
+    """
+    def prepare(self, record):
+        return record
+
+class QueueLoggingListener(QueueListener):
+    """A QueueListener that gives `logger` back its handlers on stop()."""
+
+    def __init__(self, logger, queue, *handlers):
+        QueueListener.__init__(self, queue, *handlers,
+                               respect_handler_level=True)
+        self._logger = logger
+        self._saved = logger.handlers, logger.propagate
+
+    def stop(self):
+        # Restore the logger first, so that no record can be enqueued
+        # after the sentinel that ends the thread and then be lost.
+        self._logger.handlers, self._logger.propagate = self._saved
+        QueueListener.stop(self)
+
+def queue_logging(logger, *handlers):
+    """Send `logger`'s records through a queue to `handlers`.
+
+    Until the returned listener is stopped, the queue takes the place
+    of `logger`'s own handlers and of propagation to its parents, since
+    either could block the loop.  The listener's thread does all of
+    the handlers' formatting and I/O; call its stop() method to flush
+    the queue, end the thread, and give `logger` its handlers back.
+
+    """
+    q = queue.SimpleQueue()
+    listener = QueueLoggingListener(logger, q, *handlers)
+    logger.handlers = [RawQueueHandler(q)]
+    logger.propagate = False
+    listener.start()
+    return listener
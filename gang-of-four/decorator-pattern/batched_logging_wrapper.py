@@ -0,0 +1,90 @@
+# Dynamic Decorator Pattern tuned for hot output paths:
+# rather than logging every write, tally the bytes written
+# and log them once per flush (or once per interval).
+
+import logging
+from time import monotonic
+
+class Tally(object):
+    __slots__ = ('bytes', 'writes', 'logged_at')
+
+    def __init__(self):
+        self.bytes = 0
+        self.writes = 0
+        self.logged_at = monotonic()
+
+class WriteLoggingFile4(object):
+    def __init__(self, file, logger, interval=None):
+        self._file = file
+        self._logger = logger
+        self._interval = interval
+        self._tally = Tally()
+
+    # Writes only update the tally, which is skipped entirely
+    # if the logger would discard the record anyway.
+
+    def write(self, s):
+        n = self._file.write(s)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            tally = self._tally
+            tally.bytes += len(s)
+            tally.writes += 1
+            if (self._interval is not None and
+                    monotonic() - tally.logged_at >= self._interval):
+                self._log()
+        return n
+
+    def writelines(self, strings):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            strings = list(strings)
+            self._tally.bytes += sum(len(s) for s in strings)
+            self._tally.writes += len(strings)
+        self._file.writelines(strings)
+
+    # The tally is reported whenever the data is flushed
+    # toward the operating system, and before closing.
+
+    def flush(self):
+        self._file.flush()
+        self._log()
+
+    def close(self):
+        self._log()
+        self._file.close()
+
+    def __enter__(self):
+        self._file.__enter__()
+        return self
+
+    def __exit__(self, *excinfo):
+        self._log()
+        return self._file.__exit__(*excinfo)
+
+    def _log(self):
+        tally = self._tally
+        if tally.writes:
+            self._logger.debug('wrote %s bytes in %s writes to %s',
+                               tally.bytes, tally.writes, self._file)
+            tally.bytes = 0
+            tally.writes = 0
+        tally.logged_at = monotonic()
+
+    # Offer every other method and property dynamically.
+
+    def __iter__(self):
+        return self.__dict__['_file'].__iter__()
+
+    def __next__(self):
+        return self.__dict__['_file'].__next__()
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['_file'], name)
+
+    def __setattr__(self, name, value):
+        if name in ('_file', '_logger', '_interval', '_tally'):
+            self.__dict__[name] = value
+        else:
+            setattr(self.__dict__['_file'], name, value)
+
+    def __delattr__(self, name):
+        delattr(self.__dict__['_file'], name)
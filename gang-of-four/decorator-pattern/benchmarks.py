@@ -0,0 +1,254 @@
+# Time the wrapper flavours against each other.  Run directly:
+#
+#     python3 gang-of-four/decorator-pattern/benchmarks.py
+
+import asyncio
+import io
+import logging
+import os
+import socket
+import statistics
+import tempfile
+import time
+import tracemalloc
+from timeit import timeit
+
+from async_wrapper import WriteLoggingStream, queue_logging
+from batched_logging_wrapper import WriteLoggingFile4
+from copy_powered_wrapper import StreamingWriteLoggingFile, WriteLoggingFile
+from generated_wrapper import WriteLoggingFile5
+from getattr_powered_wrapper import WriteLoggingFile3
+from tactical_wrapper import WriteLoggingFile2
+from verbose_static_wrapper import WriteLoggingFile1
+import writev_wrapper
+from writev_wrapper import WriteLoggingFile6
+
+N = 100000
+LINES = ['line {}\n'.format(i) for i in range(N)]
+
+def report(title, timings):
+    print(title)
+    baseline = timings[0][1]
+    for name, seconds in timings:
+        print('  {:<28} {:8.4f} s  {:5.2f}x'.format(
+            name, seconds, seconds / baseline))
+
+def best(function):
+    return min(timeit(function, number=1) for i in range(3))
+
+def bench_logging_wrappers():
+    logger = logging.getLogger('benchmarks')
+    logger.propagate = False
+    logger.addHandler(logging.NullHandler())
+    wrappers = [
+        ('plain file', lambda f: f),
+        ('WriteLoggingFile1 (static)',
+         lambda f: WriteLoggingFile1(f, logger)),
+        ('WriteLoggingFile2 (tactical)',
+         lambda f: WriteLoggingFile2(f, logger)),
+        ('WriteLoggingFile3 (getattr)',
+         lambda f: WriteLoggingFile3(f, logger)),
+        ('WriteLoggingFile4 (batched)',
+         lambda f: WriteLoggingFile4(f, logger)),
+    ]
+    for level in logging.INFO, logging.DEBUG:
+        logger.setLevel(level)
+        for method in 'write', 'writelines':
+            timings = []
+            for name, wrap in wrappers:
+                if method == 'writelines' and name.endswith('(tactical)'):
+                    continue
+
+                def run():
+                    w = wrap(io.StringIO())
+                    if method == 'write':
+                        write = w.write
+                        for line in LINES:
+                            write(line)
+                    else:
+                        w.writelines(LINES)
+                    if hasattr(w, 'flush'):
+                        w.flush()
+
+                timings.append((name, best(run)))
+            report('{}() x {:,}, logging at {}'.format(
+                method, N, logging.getLevelName(level)), timings)
+
+def bench_attribute_access():
+    logger = logging.getLogger('benchmarks')
+    with tempfile.TemporaryFile('w+') as f:
+        f.write('x' * 100)
+        wrappers = [
+            ('plain file', f),
+            ('WriteLoggingFile1 (static)', WriteLoggingFile1(f, logger)),
+            ('WriteLoggingFile3 (getattr)', WriteLoggingFile3(f, logger)),
+            ('WriteLoggingFile5 (generated)', WriteLoggingFile5(f, logger)),
+        ]
+        timings = []
+        for name, w in wrappers:
+
+            # The attributes that tests.py checks, plus the
+            # methods that a reader calls most often.
+            def run():
+                for i in range(N // 10):
+                    w.seek(0)
+                    w.read(1)
+                    w.tell()
+                    w.closed
+                    w.encoding
+                    w.errors
+                    w.name
+                    w.newlines
+
+            timings.append((name, best(run)))
+        report('attribute access x {:,}'.format(N // 10 * 8), timings)
+
+class SlowHandler(logging.Handler):
+    """Stand-in for a handler that blocks on disk or network I/O."""
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(0.0002)
+
+async def measure_loop_latency(wrap, writes=2000, chunk=b'x' * 512):
+    loop = asyncio.get_running_loop()
+    a, b = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=a)
+    peer_reader, peer_writer = await asyncio.open_connection(sock=b)
+    w = wrap(writer)
+    lateness = []
+    finished = asyncio.Event()
+
+    async def tick():
+        while not finished.is_set():
+            start = loop.time()
+            await asyncio.sleep(0.001)
+            lateness.append(loop.time() - start - 0.001)
+
+    async def sink():
+        while await peer_reader.read(65536):
+            pass
+        peer_writer.close()
+
+    ticker = asyncio.create_task(tick())
+    reading = asyncio.create_task(sink())
+    start = loop.time()
+    for i in range(writes):
+        w.write(chunk)
+        if i % 16 == 15:
+            await w.drain()
+            await asyncio.sleep(0)
+    await w.drain()
+    w.close()
+    await w.wait_closed()
+    elapsed = loop.time() - start
+    finished.set()
+    await ticker
+    await reading
+    return elapsed, statistics.median(lateness), max(lateness)
+
+def bench_async_wrapper():
+    direct = logging.getLogger('benchmarks.direct')
+    direct.propagate = False
+    direct.addHandler(SlowHandler())
+    direct.setLevel(logging.DEBUG)
+
+    queued = logging.getLogger('benchmarks.queued')
+    queued.setLevel(logging.DEBUG)
+    listener = queue_logging(queued, SlowHandler())
+
+    cases = [
+        ('plain StreamWriter', lambda w: w),
+        ('logging on the loop', lambda w: WriteLoggingStream(w, direct)),
+        ('logging via queue', lambda w: WriteLoggingStream(w, queued)),
+    ]
+    print('asyncio socketpair, 2,000 writes; event-loop lateness')
+    for name, wrap in cases:
+        elapsed, median, worst = asyncio.run(measure_loop_latency(wrap))
+        print('  {:<22} {:7.3f} s  median {:6.2f} ms  max {:6.2f} ms'
+              .format(name, elapsed, median * 1e3, worst * 1e3))
+    listener.stop()
+
+class CountingFileIO(io.FileIO):
+    syscalls = 0
+
+    def write(self, b):
+        self.syscalls += 1
+        return super().write(b)
+
+def bench_writev_wrapper():
+    logger = logging.getLogger('benchmarks')
+    logger.setLevel(logging.INFO)
+    chunks = [b'%019d\n' % i for i in range(N)]
+    real_writev = os.writev
+    writev_calls = []
+
+    def counting_writev(fd, buffers):
+        writev_calls.append(len(buffers))
+        return real_writev(fd, buffers)
+
+    cases = [
+        ('unbuffered file', lambda raw: raw),
+        ('buffered file', lambda raw: io.BufferedWriter(raw)),
+        ('WriteLoggingFile1, unbuffered',
+         lambda raw: WriteLoggingFile1(raw, logger)),
+        ('WriteLoggingFile6 (writev)',
+         lambda raw: WriteLoggingFile6(raw, logger)),
+    ]
+    print('write() x {:,} of {} bytes'.format(N, len(chunks[0])))
+    writev_wrapper.os.writev = counting_writev
+    try:
+        for name, wrap in cases:
+            with tempfile.TemporaryDirectory() as directory:
+                raw = CountingFileIO(os.path.join(directory, 'out'), 'w')
+                del writev_calls[:]
+                w = wrap(raw)
+                start = time.perf_counter()
+                for chunk in chunks:
+                    w.write(chunk)
+                w.flush()
+                elapsed = time.perf_counter() - start
+                syscalls = raw.syscalls + len(writev_calls)
+                raw.close()
+            print('  {:<30} {:7.4f} s  {:6.1f} MB/s  {:7,} syscalls'.format(
+                name, elapsed, N * len(chunks[0]) / elapsed / 1e6,
+                syscalls))
+    finally:
+        writev_wrapper.os.writev = real_writev
+
+def bench_uppercase():
+    payloads = [
+        ('one 64 MB bytes write', [b'hello, world! ' * (64 << 16)]),
+        ('one 64 MB str write', ['hello, world! ' * (64 << 16)]),
+        ('{:,} small bytes writes'.format(N), [b'hello, world!\n'] * N),
+    ]
+    cases = [
+        ('WriteLoggingFile (upper)', WriteLoggingFile),
+        ('StreamingWriteLoggingFile', StreamingWriteLoggingFile),
+    ]
+    for title, payload in payloads:
+        size = sum(len(p) for p in payload)
+        print(title)
+        for name, cls in cases:
+            mode = 'w' if isinstance(payload[0], str) else 'wb'
+            with open(os.devnull, mode) as f:
+                w = cls(f)
+
+                def run():
+                    for p in payload:
+                        w.write(p)
+
+                elapsed = best(run)
+                tracemalloc.start()
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            print('  {:<28} {:8.1f} MB/s  peak {:8.2f} MB'.format(
+                name, size / elapsed / 1e6, peak / 1e6))
+
+if __name__ == '__main__':
+    bench_logging_wrappers()
+    bench_attribute_access()
+    bench_async_wrapper()
+    bench_writev_wrapper()
+    bench_uppercase()
@@ -1,3 +1,6 @@
+import errno
+import io
+
 # Traditional decorator: terribly verbose
 
 class WriteLoggingFile(object):
@@ -17,3 +20,61 @@ class WriteLoggingFile(object):
 
     def __getattr__(self, name):
         return getattr(self.__dict__['file'], name)
+
+# Streaming variant: uppercase any bytes-like object, plus text,
+# a chunk at a time, so that a huge write never needs a second
+# full-size uppercase copy of its data in memory at once.
+
+UPPERCASE = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz',
+                            b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+class StreamingWriteLoggingFile(WriteLoggingFile):
+    def __init__(self, file, chunk_size=65536):
+        WriteLoggingFile.__init__(self, file)
+        self.chunk_size = chunk_size
+
+    def write(self, s):
+        # Small bytes and str writes, the common case, cost one type
+        # test and one comparison more than WriteLoggingFile.write().
+        # Like UPPERCASE, bytes.upper() changes only ASCII letters.
+        kind = type(s)
+        if (kind is bytes or kind is str) and len(s) <= self.chunk_size:
+            return self.file.write(s.upper())
+        if isinstance(s, str):
+            return self._write_chunks(_upper_text_chunks(s, self.chunk_size))
+        try:
+            view = memoryview(s).cast('B')
+        except TypeError:
+            raise TypeError('you can only write str or bytes-like'
+                            ' objects to a file') from None
+        return self._write_chunks(_upper_byte_chunks(view, self.chunk_size))
+
+    def _write_chunks(self, chunks):
+        write = self.file.write
+        # A raw file may write only part of a chunk, or, if it is
+        # non-blocking, nothing at all, which it reports as None.  Other
+        # wrappers, like WriteLoggingFile3, return None after writing
+        # the whole chunk.
+        raw = isinstance(self.file, io.RawIOBase)
+        n = 0
+        for chunk in chunks:
+            while chunk:
+                written = write(chunk)
+                if written is None and not raw:
+                    written = len(chunk)
+                elif written is None:
+                    raise BlockingIOError(errno.EAGAIN, 'write could not'
+                                          ' complete without blocking', n)
+                elif written == 0:
+                    raise OSError(errno.EIO, 'write() wrote nothing')
+                n += written
+                chunk = chunk[written:]
+        return n
+
+def _upper_text_chunks(s, size):
+    for i in range(0, len(s), size):
+        yield s[i:i + size].upper()
+
+def _upper_byte_chunks(view, size):
+    for i in range(0, len(view), size):
+        yield view[i:i + size].tobytes().translate(UPPERCASE)
@@ -0,0 +1,90 @@
+# Generated Decorator Pattern: introspect the wrapped class once,
+# and write all of the boilerplate of WriteLoggingFile1 for us.
+
+from functools import lru_cache
+from operator import attrgetter
+
+class WriteLogging(object):
+    def __init__(self, file, logger):
+        self._file = file
+        self._logger = logger
+
+    # The two methods we actually want to specialize,
+    # to log each occasion on which data is written.
+
+    def write(self, s):
+        self._file.write(s)
+        self._logger.debug('wrote %s bytes to %s', len(s), self._file)
+
+    def writelines(self, strings):
+        if self.closed:
+            raise ValueError('this file is closed')
+        for s in strings:
+            self.write(s)
+
+class WriteLoggingFile5(WriteLogging):
+    # Instantiating this class really creates an instance of the
+    # subclass generated for the type of `file`.
+
+    def __new__(cls, file, logger):
+        if cls is WriteLoggingFile5:
+            cls = delegating_class(
+                cls, type(file), tuple(sorted(getattr(file, '__dict__', ()))))
+        return object.__new__(cls)
+
+# Special methods are looked up on the class, never the instance,
+# so the few that a file needs must be generated explicitly.
+
+SPECIAL_METHODS = ('__enter__', '__exit__', '__iter__', '__next__',
+                   '__repr__')
+
+@lru_cache(maxsize=None)
+def delegating_class(decorator, wrapped_type, instance_attributes=()):
+    """Build a subclass of `decorator` that delegates to `wrapped_type`.
+
+    Every public method and attribute of `wrapped_type`, plus the
+    listed `instance_attributes`, becomes a property of the new class
+    that forwards to the ``_file`` being wrapped, unless `decorator`
+    already defines it.  The class is built once per wrapped type and
+    then reused, so no attribute lookup ever has to fail and fall back
+    to ``__getattr__()`` the way WriteLoggingFile3 does.
+
+    """
+    names = set(instance_attributes)
+    for klass in wrapped_type.__mro__:
+        names.update(vars(klass))
+
+    namespace = {}
+    for name in sorted(names):
+        if name in SPECIAL_METHODS and hasattr(wrapped_type, name):
+            namespace[name] = _delegating_method(
+                name, getattr(wrapped_type, name))
+        elif not name.startswith('_') and not hasattr(decorator, name):
+            namespace[name] = _delegating_property(name)
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['_file'], name)
+
+    namespace['__getattr__'] = __getattr__
+    namespace['__module__'] = decorator.__module__
+    name = '{}For{}'.format(decorator.__name__, wrapped_type.__name__)
+    return type(name, (decorator,), namespace)
+
+def _delegating_method(name, function):
+    def method(self, *args):
+        return function(self._file, *args)
+    method.__name__ = name
+    return method
+
+# Reading an attribute through attrgetter('_file.name') runs entirely
+# in C; for a method, it returns the wrapped file's own bound method,
+# which the caller then invokes directly.
+
+def _delegating_property(name):
+    def fset(self, value):
+        setattr(self._file, name, value)
+
+    def fdel(self):
+        delattr(self._file, name)
+
+    return property(attrgetter('_file.' + name), fset, fdel)
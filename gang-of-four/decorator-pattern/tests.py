@@ -1,10 +1,20 @@
+import array
+import asyncio
+import io
 import logging
+import os
+import socket
 import tempfile
+import threading
 import unittest
 
-#from . import copy_powered_wrapper
+from . import async_wrapper
+from . import copy_powered_wrapper
+from . import batched_logging_wrapper
+from . import generated_wrapper
 from . import getattr_powered_wrapper
 from . import verbose_static_wrapper
+from . import writev_wrapper
 
 def wrap(cls, normal_file):
     logger = logging.getLogger('testlog')
@@ -23,6 +33,8 @@ class MyTests(BaseCase):
         for cls in (
                 verbose_static_wrapper.WriteLoggingFile1,
                 getattr_powered_wrapper.WriteLoggingFile3,
+                batched_logging_wrapper.WriteLoggingFile4,
+                generated_wrapper.WriteLoggingFile5,
         ):
             with tempfile.TemporaryFile('w+') as f:
                 logger = logging.getLogger('testlog')
@@ -45,3 +57,320 @@ class MyTests(BaseCase):
                             # TODO: why readinto?
                             'file', 'logger', 'readinto'):
                         getattr(f, name)
+
+class BatchedLoggingTests(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('testlog.batched')
+        self.addCleanup(self.logger.setLevel, self.logger.level)
+
+    def test_one_record_per_flush(self):
+        self.logger.setLevel(logging.DEBUG)
+        with tempfile.TemporaryFile('w+') as f:
+            w = batched_logging_wrapper.WriteLoggingFile4(f, self.logger)
+            with self.assertLogs(self.logger, 'DEBUG') as logs:
+                w.write('abc')
+                w.writelines(iter(['de', 'fgh']))
+                w.flush()
+                w.flush()
+                w.write('ij')
+                w.close()
+            self.assertEqual(len(logs.records), 2)
+            self.assertEqual(logs.records[0].args[:2], (8, 3))
+            self.assertEqual(logs.records[1].args[:2], (2, 1))
+            self.assertTrue(f.closed)
+
+    def test_no_records_when_debug_is_off(self):
+        records = []
+        handler = logging.Handler(logging.DEBUG)
+        handler.emit = records.append
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.logger.setLevel(logging.INFO)
+        with tempfile.TemporaryFile('w+') as f:
+            with batched_logging_wrapper.WriteLoggingFile4(
+                    f, self.logger) as w:
+                w.write('abc')
+                w.writelines(['de', 'fgh'])
+                w.flush()
+                w.seek(0)
+                self.assertEqual(w.read(), 'abcdefgh')
+        self.assertEqual(records, [])
+
+    def test_writelines_is_one_call(self):
+        calls = []
+
+        class File(object):
+            def writelines(self, strings):
+                calls.append(list(strings))
+
+        self.logger.setLevel(logging.DEBUG)
+        w = batched_logging_wrapper.WriteLoggingFile4(File(), self.logger)
+        w.writelines(s for s in ['a', 'b', 'c'])
+        self.assertEqual(calls, [['a', 'b', 'c']])
+
+class GeneratedWrapperTests(unittest.TestCase):
+    def test_class_is_built_once_per_type(self):
+        logger = logging.getLogger('testlog')
+        with tempfile.TemporaryFile('w+') as f, \
+                tempfile.TemporaryFile('w+') as g, \
+                tempfile.TemporaryFile('wb+') as h:
+            wrap = generated_wrapper.WriteLoggingFile5
+            self.assertIs(type(wrap(f, logger)), type(wrap(g, logger)))
+            self.assertIsNot(type(wrap(f, logger)), type(wrap(h, logger)))
+            self.assertIsInstance(wrap(f, logger), wrap)
+
+    def test_delegation_is_static(self):
+        logger = logging.getLogger('testlog')
+        with tempfile.TemporaryFile('w+') as f:
+            w = generated_wrapper.WriteLoggingFile5(f, logger)
+            for name in 'read', 'seek', 'tell', 'closed', 'newlines', 'mode':
+                self.assertIn(name, vars(type(w)))
+            with self.assertLogs(logger, 'DEBUG'):
+                w.writelines(['abc', 'def'])
+            w.seek(0)
+            self.assertEqual(w.read(), 'abcdef')
+            self.assertEqual(w.tell(), 6)
+            w.mode = 'r+'
+            self.assertEqual(f.mode, 'r+')
+
+class AsyncWrapperTests(unittest.IsolatedAsyncioTestCase):
+    async def test_writes_and_logs_off_the_loop_thread(self):
+        threads = []
+
+        class Handler(logging.Handler):
+            def emit(self, record):
+                threads.append((threading.get_ident(), record.getMessage()))
+
+        logger = logging.getLogger('testlog.async')
+        logger.setLevel(logging.DEBUG)
+        own = logging.NullHandler()
+        logger.addHandler(own)
+        self.addCleanup(logger.removeHandler, own)
+        listener = async_wrapper.queue_logging(logger, Handler())
+        self.addCleanup(listener.stop)
+
+        a, b = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=a)
+        peer_reader, peer_writer = await asyncio.open_connection(sock=b)
+        w = async_wrapper.WriteLoggingStream(writer, logger)
+        w.write(b'abc')
+        w.writelines([b'de', b'f'])
+        await w.drain()
+        self.assertFalse(w.is_closing())
+        w.close()
+        await w.wait_closed()
+        self.assertEqual(await peer_reader.read(), b'abcdef')
+        peer_writer.close()
+        await peer_writer.wait_closed()
+        listener.stop()
+
+        self.assertEqual([message.split(' to ')[0] for i, message in threads],
+                         ['wrote 3 bytes', 'wrote 3 bytes'])
+        self.assertNotIn(threading.get_ident(), {i for i, m in threads})
+        self.assertEqual(logger.handlers, [own])
+        self.assertTrue(logger.propagate)
+
+    async def test_wraps_writers_without_extra_info(self):
+        class Writer(object):
+            def __init__(self):
+                self.data = []
+
+            def write(self, data):
+                self.data.append(data)
+
+            async def drain(self):
+                pass
+
+        writer = Writer()
+        w = async_wrapper.WriteLoggingStream(writer, logging.getLogger('x'))
+        w.write(b'abc')
+        await w.drain()
+        self.assertEqual(writer.data, [b'abc'])
+        self.assertEqual(w._peer, repr(writer))
+
+class WritevWrapperTests(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        real_writev = os.writev
+
+        def writev(fd, buffers, limit=None):
+            self.calls.append(len(buffers))
+            if limit is None:
+                return real_writev(fd, buffers)
+            data = b''.join(bytes(b) for b in buffers)[:limit]
+            return os.write(fd, data)
+
+        self.writev = writev
+        writev_wrapper.os.writev = writev
+        self.addCleanup(setattr, writev_wrapper.os, 'writev', real_writev)
+        self.logger = logging.getLogger('testlog')
+
+    def test_writes_are_gathered(self):
+        for buffering in 0, -1:
+            del self.calls[:]
+            with tempfile.TemporaryFile('wb+', buffering=buffering) as f:
+                w = writev_wrapper.WriteLoggingFile6(f, self.logger,
+                                                     max_bytes=10)
+                w.write(b'abc')
+                w.write(memoryview(b'defg'))
+                self.assertEqual(self.calls, [])
+                w.write(bytearray(b'hij'))
+                self.assertEqual(self.calls, [3])
+                w.writelines([b'k', array.array('B', b'lm')])
+                self.assertEqual(w.tell(), 13)
+                w.seek(0)
+                self.assertEqual(w.read(), b'abcdefghijklm')
+                w.write(b'nop')
+                w.flush()
+                self.assertEqual(self.calls, [3, 2, 1])
+                self.assertEqual(f.tell(), 16)
+                with self.assertRaises(TypeError):
+                    w.write('text')
+
+    def test_partial_writes_are_resumed(self):
+        writev = self.writev
+        writev_wrapper.os.writev = lambda fd, bufs: writev(fd, bufs, 3)
+        with tempfile.TemporaryFile('wb+', buffering=0) as f:
+            w = writev_wrapper.WriteLoggingFile6(f, self.logger)
+            w.writelines([b'abcd', b'e', b'fghijkl'])
+            w.flush()
+            self.assertEqual(len(self.calls), 4)
+            f.seek(0)
+            self.assertEqual(f.read(), b'abcdefghijkl')
+
+    def test_line_reads_see_pending_writes(self):
+        with tempfile.TemporaryFile('wb+') as f:
+            w = writev_wrapper.WriteLoggingFile6(f, self.logger)
+            w.write(b'hello\nworld\n')
+            w.seek(0)
+            w.write(b'jello\n')
+            self.assertEqual(w.readline(), b'world\n')
+            w.write(b'there\n')
+            self.assertEqual(list(w), [])
+            w.seek(0)
+            self.assertEqual(w.readlines(),
+                             [b'jello\n', b'world\n', b'there\n'])
+
+    def test_failed_writev_keeps_pending_data(self):
+        def writev(fd, buffers):
+            raise OSError('disk full')
+
+        with tempfile.TemporaryFile('wb+', buffering=0) as f:
+            w = writev_wrapper.WriteLoggingFile6(f, self.logger)
+            w.write(b'abc')
+            writev_wrapper.os.writev = writev
+            with self.assertRaises(OSError):
+                w.flush()
+            writev_wrapper.os.writev = self.writev
+            w.flush()
+            f.seek(0)
+            self.assertEqual(f.read(), b'abc')
+
+    def test_failed_writev_still_closes(self):
+        def writev(fd, buffers):
+            raise OSError('disk full')
+
+        writev_wrapper.os.writev = writev
+        f = tempfile.TemporaryFile('wb+', buffering=0)
+        w = writev_wrapper.WriteLoggingFile6(f, self.logger)
+        w.write(b'abc')
+        self.assertRaises(OSError, w.close)
+        self.assertTrue(f.closed)
+
+        f = tempfile.TemporaryFile('wb+', buffering=0)
+        with self.assertRaises(OSError):
+            with writev_wrapper.WriteLoggingFile6(f, self.logger) as w:
+                w.write(b'abc')
+        self.assertTrue(f.closed)
+
+        f = tempfile.TemporaryFile('wb+', buffering=0)
+        with self.assertRaises(KeyError):
+            with writev_wrapper.WriteLoggingFile6(f, self.logger) as w:
+                w.write(b'abc')
+                raise KeyError('body')
+        self.assertTrue(f.closed)
+
+    def test_write_to_closed_file(self):
+        f = tempfile.TemporaryFile('wb+')
+        w = writev_wrapper.WriteLoggingFile6(f, self.logger)
+        w.close()
+        with self.assertRaises(ValueError):
+            w.write(b'abc')
+
+class StreamingUppercaseTests(unittest.TestCase):
+    def test_output_matches_upper(self):
+        text = 'Hello, wörld — straße ﬁsh! ' * 50
+        data = bytes(range(256)) * 20
+        for chunk_size in 1, 7, 4096:
+            for s, mode in (text, 'w+'), (data, 'wb+'):
+                with tempfile.TemporaryFile(mode) as f, \
+                        tempfile.TemporaryFile(mode) as g:
+                    copy_powered_wrapper.WriteLoggingFile(f).write(s)
+                    w = copy_powered_wrapper.StreamingWriteLoggingFile(
+                        g, chunk_size)
+                    w.write(s)
+                    if mode == 'wb+':
+                        w.write(bytearray(s))
+                        w.write(memoryview(s)[10:])
+                        words = array.array('H')
+                        words.frombytes(s)
+                        w.write(words)
+                        f.write(s.upper() + s[10:].upper() + s.upper())
+                    f.seek(0)
+                    w.seek(0)
+                    self.assertEqual(w.read(), f.read())
+
+    def test_rejects_other_types(self):
+        with tempfile.TemporaryFile('wb+') as f:
+            w = copy_powered_wrapper.StreamingWriteLoggingFile(f)
+            with self.assertRaises(TypeError):
+                w.write(12)
+
+    def test_stacks_on_other_wrappers(self):
+        logger = logging.getLogger('testlog')
+        with tempfile.TemporaryFile('w+') as f:
+            inner = getattr_powered_wrapper.WriteLoggingFile3(f, logger)
+            w = copy_powered_wrapper.StreamingWriteLoggingFile(inner, 4)
+            self.assertEqual(w.write('hello world'), 11)
+            f.seek(0)
+            self.assertEqual(f.read(), 'HELLO WORLD')
+
+    def test_short_writes_are_resumed(self):
+        class File(object):
+            def __init__(self):
+                self.data = b''
+
+            def write(self, b):
+                self.data += bytes(b[:3])
+                return min(len(b), 3)
+
+        f = File()
+        w = copy_powered_wrapper.StreamingWriteLoggingFile(f, 4)
+        self.assertEqual(w.write(bytearray(b'hello world')), 11)
+        self.assertEqual(f.data, b'HELLO WORLD')
+
+    def test_raw_writes_that_make_no_progress_raise(self):
+        class Raw(io.RawIOBase):
+            def __init__(self, results):
+                self.data = b''
+                self.results = results
+
+            def writable(self):
+                return True
+
+            def write(self, b):
+                written = self.results.pop(0)
+                if written:
+                    self.data += bytes(b[:written])
+                return written
+
+        f = Raw([3, 1, 2, None])
+        w = copy_powered_wrapper.StreamingWriteLoggingFile(f, 4)
+        with self.assertRaises(BlockingIOError) as cm:
+            w.write(bytearray(b'hello world'))
+        self.assertEqual(cm.exception.characters_written, 6)
+        self.assertEqual(f.data, b'HELLO ')
+
+        w = copy_powered_wrapper.StreamingWriteLoggingFile(Raw([2, 0]), 4)
+        with self.assertRaises(OSError):
+            w.write(bytearray(b'hello world'))
@@ -0,0 +1,163 @@
+# Buffering Decorator Pattern: gather many small writes in a list,
+# then hand the whole list to the operating system in one writev()
+# call on the file descriptor, logging once per call.
+
+import os
+
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+
+class WriteLoggingFile6(object):
+    """Buffer bytes-like writes and flush them with a single writev().
+
+    Buffers are kept by reference rather than copied, so a caller that
+    passes a bytearray or memoryview must not modify it until the next
+    flush.  Reads, seeks, and the other operations that depend on the
+    file position flush the pending writes first.
+
+    """
+    def __init__(self, file, logger, max_bytes=65536, max_buffers=IOV_MAX):
+        self._file = file
+        self._logger = logger
+        self._max_bytes = max_bytes
+        self._max_buffers = min(max_buffers, IOV_MAX)
+        self._buffers = []
+        self._sizes = []
+        self._pending = 0
+
+    def write(self, b):
+        if isinstance(b, str):
+            raise TypeError('a bytes-like object is required, not str')
+        if self._file.closed:
+            raise ValueError('write to closed file')
+        n = memoryview(b).nbytes
+        self._buffers.append(b)
+        self._sizes.append(n)
+        self._pending += n
+        if (self._pending >= self._max_bytes or
+                len(self._buffers) >= self._max_buffers):
+            self._drain()
+        return n
+
+    def writelines(self, lines):
+        for b in lines:
+            self.write(b)
+
+    def _drain(self):
+        buffers = self._buffers
+        sizes = self._sizes
+        if not buffers:
+            return
+        total = self._pending
+        self._file.flush()  # also rewinds a buffered reader's read-ahead
+        fd = self._file.fileno()
+        calls = 0
+        i = 0
+        try:
+            while i < len(buffers):
+                j = min(len(buffers), i + IOV_MAX)
+                n = os.writev(fd, buffers[i:j])
+                calls += 1
+                if n == sum(sizes[i:j]):
+                    i = j
+                    continue
+                while n >= sizes[i]:
+                    n -= sizes[i]
+                    i += 1
+                buffers[i] = memoryview(buffers[i]).cast('B')[n:]
+                sizes[i] -= n
+        finally:
+            # Forget only what reached the file, so that an error
+            # leaves the rest pending rather than losing it.
+            del buffers[:i]
+            del sizes[:i]
+            self._pending = sum(sizes)
+
+        # A buffered file caches its position, which writev() has
+        # just moved behind its back; a relative seek refreshes it.
+        if hasattr(self._file, 'raw') and self._file.seekable():
+            self._file.seek(0, os.SEEK_CUR)
+
+        self._logger.debug('wrote %s bytes in %s writev() calls to %s',
+                           total, calls, self._file)
+
+    # Operations that must see every byte written so far.
+
+    def flush(self):
+        self._drain()
+        return self._file.flush()
+
+    def close(self):
+        # Like io's close(), close the file even if the flush fails.
+        try:
+            if not self._file.closed:
+                self._drain()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        self._file.__enter__()
+        return self
+
+    def __exit__(self, *excinfo):
+        try:
+            self._drain()
+        except Exception:
+            # An exception from the with-body matters more than one
+            # from the flush that it cut short.
+            if excinfo[0] is None:
+                raise
+        finally:
+            suppress = self._file.__exit__(*excinfo)
+        return suppress
+
+    def read(self, *args):
+        self._drain()
+        return self._file.read(*args)
+
+    def read1(self, *args):
+        self._drain()
+        return self._file.read1(*args)
+
+    def readinto(self, buffer):
+        self._drain()
+        return self._file.readinto(buffer)
+
+    def readinto1(self, buffer):
+        self._drain()
+        return self._file.readinto1(buffer)
+
+    def readline(self, *args):
+        self._drain()
+        return self._file.readline(*args)
+
+    def readlines(self, *args):
+        self._drain()
+        return self._file.readlines(*args)
+
+    def peek(self, *args):
+        self._drain()
+        return self._file.peek(*args)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._drain()
+        return self._file.__next__()
+
+    def seek(self, *args):
+        self._drain()
+        return self._file.seek(*args)
+
+    def tell(self):
+        self._drain()
+        return self._file.tell()
+
+    def truncate(self, *args):
+        self._drain()
+        return self._file.truncate(*args)
+
+    # Offer every other method and property dynamically.
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['_file'], name)
@@ -0,0 +1,119 @@
+# Measure how much memory a flyweight pool saves on a large, heavily
+# duplicated population of glyph metrics, and how columnar extrinsic
+# state compares with one object per glyph occurrence.  Run directly,
+# optionally giving the number of pool records (default ten million):
+#
+#     python3 gang-of-four/flyweight/benchmarks.py [records]
+
+import random
+import sys
+import time
+import tracemalloc
+
+from columns import GlyphColumns
+from pool import FlyweightPool
+
+RECORDS = 10000000
+OCCURRENCES = 1000000
+DISTINCT = 1000
+
+class Glyph(object):
+    __slots__ = ('width', 'ascent', 'descent', '__weakref__')
+
+    def __init__(self, metrics):
+        self.width, self.ascent, self.descent = metrics
+
+def metrics(n):
+    # Rebuild each tuple, as a parser would, so that equal records are
+    # still distinct objects until something interns them.
+    rng = random.Random(0)
+    table = [(rng.randrange(4, 40), rng.randrange(8, 30), rng.randrange(0, 9))
+             for i in range(DISTINCT)]
+    for i in range(n):
+        width, ascent, descent = table[rng.randrange(DISTINCT)]
+        yield width, ascent, descent
+
+def naive(n):
+    return list(metrics(n))
+
+def pooled_tuples(n):
+    get = FlyweightPool().get
+    return [get(m) for m in metrics(n)]
+
+def pooled_glyphs(n):
+    get = FlyweightPool(Glyph).get
+    return [get(m) for m in metrics(n)]
+
+def pooled_lru(n):
+    get = FlyweightPool(Glyph, maxsize=DISTINCT // 2).get
+    return [get(m) for m in metrics(n)]
+
+def measure(build, n):
+    start = time.perf_counter()
+    records = build(n)
+    elapsed = time.perf_counter() - start
+    del records
+    tracemalloc.start()
+    records = build(n)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, peak
+
+def bench_pool(n):
+    print('{:,} records, {:,} distinct'.format(n, DISTINCT))
+    baseline = None
+    for name, build in [('naive tuples', naive),
+                        ('pooled tuples', pooled_tuples),
+                        ('pooled glyphs', pooled_glyphs),
+                        ('pooled glyphs, LRU', pooled_lru)]:
+        elapsed, current, peak = measure(build, n)
+        baseline = baseline or current
+        print('  {:<20} {:7.2f} s  {:8.1f} MB  peak {:8.1f} MB  {:5.2f}x'
+              .format(name, elapsed, current / 1e6, peak / 1e6,
+                      current / baseline))
+
+class Occurrence(object):
+    def __init__(self, glyph, x, y):
+        self.glyph = glyph
+        self.x = x
+        self.y = y
+
+def occurrences(n):
+    glyphs = [Glyph(m) for m in set(metrics(DISTINCT * 10))]
+    for i in range(n):
+        yield glyphs[i % len(glyphs)], i % 2000, i // 2000 * 14
+
+def one_object_each(n):
+    return [Occurrence(glyph, x, y) for glyph, x, y in occurrences(n)]
+
+def columnar(n):
+    columns = GlyphColumns()
+    append = columns.append
+    for glyph, x, y in occurrences(n):
+        append(glyph, x, y)
+    return columns
+
+def bench_columns(n=OCCURRENCES):
+    print('{:,} glyph occurrences'.format(n))
+    objects = one_object_each(n)
+    columns = columnar(n)
+    for name, build in [('one object each', one_object_each),
+                        ('columns', columnar)]:
+        elapsed, current, peak = measure(build, n)
+        print('  {:<20} {:7.2f} s  {:6.1f} bytes per occurrence'.format(
+            name, elapsed, current / n))
+    for name, loop in [
+            ('objects', lambda: sum(o.x + o.glyph.width for o in objects)),
+            ('column views', lambda: sum(v.x + v.glyph.width
+                                         for v in columns)),
+            ('column items', lambda: sum(x + g.width
+                                         for g, x, y in columns.items())),
+            ]:
+        start = time.perf_counter()
+        loop()
+        elapsed = time.perf_counter() - start
+        print('  iterate {:<12} {:7.3f} s'.format(name, elapsed))
+
+if __name__ == '__main__':
+    bench_pool(int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS)
+    bench_columns()
@@ -0,0 +1,80 @@
+# Extrinsic state stored by column instead of by object.  A page of
+# text might hold a million glyph occurrences but only a hundred
+# distinct glyphs; rather than a million objects, each with its own
+# __dict__, the positions live in three arrays of C integers (x, y,
+# and an index into a table of shared glyph flyweights), and a small
+# view object is built only when a caller asks for one occurrence.
+
+from array import array
+
+class GlyphColumns(object):
+    """A sequence of glyph occurrences stored as parallel columns."""
+
+    def __init__(self):
+        self.glyphs = []
+        self._indexes = {}
+        self.x = array('i')
+        self.y = array('i')
+        self.glyph_index = array('i')
+
+    def append(self, glyph, x, y):
+        index = self._indexes.get(glyph)
+        if index is None:
+            index = self._indexes[glyph] = len(self.glyphs)
+            self.glyphs.append(glyph)
+        self.glyph_index.append(index)
+        self.x.append(x)
+        self.y.append(y)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.x)
+        if not 0 <= i < len(self.x):
+            raise IndexError('glyph occurrence index out of range')
+        return GlyphView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.x)):
+            yield GlyphView(self, i)
+
+    def items(self):
+        """Iterate over (glyph, x, y) tuples without building views."""
+        glyphs = self.glyphs
+        for index, x, y in zip(self.glyph_index, self.x, self.y):
+            yield glyphs[index], x, y
+
+class GlyphView(object):
+    """One glyph occurrence, read from and written to the columns."""
+    __slots__ = ('_columns', '_i')
+
+    def __init__(self, columns, i):
+        self._columns = columns
+        self._i = i
+
+    @property
+    def glyph(self):
+        c = self._columns
+        return c.glyphs[c.glyph_index[self._i]]
+
+    @property
+    def x(self):
+        return self._columns.x[self._i]
+
+    @x.setter
+    def x(self, value):
+        self._columns.x[self._i] = value
+
+    @property
+    def y(self):
+        return self._columns.y[self._i]
+
+    @y.setter
+    def y(self, value):
+        self._columns.y[self._i] = value
+
+    def __repr__(self):
+        return '<GlyphView {!r} at ({}, {})>'.format(
+            self.glyph, self.x, self.y)
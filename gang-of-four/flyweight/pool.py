@@ -0,0 +1,96 @@
+# A reusable flyweight factory for values other than strings.  Each
+# key is looked up in the pool, and a new flyweight is only built (by
+# calling the factory with the key) the first time that key is seen.
+#
+# Entries are held weakly whenever possible, so a flyweight that no
+# caller is using any more is collected.  Two kinds of entry cannot be:
+# objects that do not support weak references at all, like tuples and
+# ints, and objects interned as their own key, since a dictionary's
+# strong reference to the key would keep the value alive forever.
+# Those are held strongly, either forever or, if the pool is given a
+# `maxsize`, only until they become the least recently used.
+
+from collections import OrderedDict, namedtuple
+from weakref import WeakValueDictionary, ref
+
+PoolInfo = namedtuple('PoolInfo', 'hits misses maxsize currsize')
+
+_missing = object()
+
+class FlyweightPool(object):
+    """Interns flyweights by key, keeping hit and miss statistics.
+
+    With no `factory` each key is its own flyweight, which makes the
+    pool a ``sys.intern()`` for tuples and other hashable values.  With
+    a `maxsize` the pool also keeps strong references to the `maxsize`
+    most recently used flyweights, evicting older ones.
+
+    """
+    def __init__(self, factory=None, maxsize=None):
+        self.factory = factory
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._weak = WeakValueDictionary()
+        self._strong = {} if maxsize is None else OrderedDict()
+
+    def get(self, key):
+        strong = self._strong
+        value = strong.get(key, _missing)
+        if value is not _missing:
+            if self.maxsize is not None:
+                strong.move_to_end(key)
+            self.hits += 1
+            return value
+        value = self._weak.get(key, _missing)
+        if value is not _missing:
+            self.hits += 1
+            if self.maxsize is not None:
+                self._remember(key, value)
+            return value
+        self.misses += 1
+        value = key if self.factory is None else self.factory(key)
+        if value is not key and _weakly_referenceable(value):
+            self._weak[key] = value
+            if self.maxsize is not None:
+                self._remember(key, value)
+        else:
+            self._remember(key, value)
+        return value
+
+    __call__ = get
+
+    def _remember(self, key, value):
+        strong = self._strong
+        strong[key] = value
+        if self.maxsize is not None and len(strong) > self.maxsize:
+            strong.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._strong or key in self._weak
+
+    def __len__(self):
+        weak = self._weak
+        return len(weak) + sum(1 for key in self._strong if key not in weak)
+
+    def info(self):
+        return PoolInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    def clear(self):
+        self._weak.clear()
+        self._strong.clear()
+        self.hits = self.misses = 0
+
+_referenceable = {}
+
+def _weakly_referenceable(value):
+    cls = type(value)
+    answer = _referenceable.get(cls)
+    if answer is None:
+        try:
+            ref(value)
+        except TypeError:
+            answer = False
+        else:
+            answer = True
+        _referenceable[cls] = answer
+    return answer
@@ -0,0 +1,84 @@
+import gc
+import unittest
+
+from . import columns, pool
+
+class Glyph(object):
+    def __init__(self, metrics):
+        self.width, self.ascent, self.descent = metrics
+
+class FlyweightPoolTests(unittest.TestCase):
+    def test_tuples_are_interned(self):
+        p = pool.FlyweightPool()
+        a = p.get(tuple([10, 12, 3]))
+        b = p.get(tuple([10, 12, 3]))
+        self.assertIs(a, b)
+        self.assertEqual(p.info(), pool.PoolInfo(1, 1, None, 1))
+
+    def test_unused_flyweights_are_collected(self):
+        p = pool.FlyweightPool(Glyph)
+        glyph = p((10, 12, 3))
+        self.assertIs(p((10, 12, 3)), glyph)
+        self.assertIn((10, 12, 3), p)
+        del glyph
+        gc.collect()
+        self.assertNotIn((10, 12, 3), p)
+        self.assertEqual(len(p), 0)
+
+    def test_lru_keeps_recent_flyweights(self):
+        p = pool.FlyweightPool(Glyph, maxsize=2)
+        p((1, 1, 1))
+        p((2, 2, 2))
+        p((1, 1, 1))
+        p((3, 3, 3))
+        gc.collect()
+        self.assertIn((1, 1, 1), p)
+        self.assertNotIn((2, 2, 2), p)
+        self.assertIn((3, 3, 3), p)
+        self.assertEqual(p.info(), pool.PoolInfo(1, 3, 2, 2))
+
+    def test_lru_bounds_strongly_held_values(self):
+        p = pool.FlyweightPool(maxsize=100)
+        for i in range(1000):
+            p.get((i, i))
+        self.assertEqual(len(p), 100)
+        self.assertIn((999, 999), p)
+        self.assertNotIn((0, 0), p)
+
+    def test_evicted_flyweight_still_in_use_is_found(self):
+        p = pool.FlyweightPool(Glyph, maxsize=1)
+        glyph = p((1, 1, 1))
+        p((2, 2, 2))
+        self.assertIs(p((1, 1, 1)), glyph)
+        self.assertEqual(p.hits, 1)
+
+    def test_clear(self):
+        p = pool.FlyweightPool()
+        p.get('a')
+        p.clear()
+        self.assertEqual(p.info(), pool.PoolInfo(0, 0, None, 0))
+
+class GlyphColumnsTests(unittest.TestCase):
+    def setUp(self):
+        self.a, self.b = Glyph((10, 12, 3)), Glyph((8, 12, 0))
+        self.columns = columns.GlyphColumns()
+        for i, glyph in enumerate([self.a, self.b, self.a]):
+            self.columns.append(glyph, 10 * i, 5)
+
+    def test_glyphs_are_shared(self):
+        self.assertEqual(self.columns.glyphs, [self.a, self.b])
+        self.assertEqual(list(self.columns.glyph_index), [0, 1, 0])
+
+    def test_views(self):
+        view = self.columns[-1]
+        self.assertIs(view.glyph, self.a)
+        self.assertEqual((view.x, view.y), (20, 5))
+        view.x = 25
+        self.assertEqual(self.columns.x[2], 25)
+        self.assertFalse(hasattr(view, '__dict__'))
+        self.assertRaises(IndexError, self.columns.__getitem__, 3)
+
+    def test_iteration(self):
+        self.assertEqual([(v.glyph, v.x) for v in self.columns],
+                         [(g, x) for g, x, y in self.columns.items()])
+        self.assertEqual(len(self.columns), 3)
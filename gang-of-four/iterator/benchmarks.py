@@ -0,0 +1,90 @@
+# Compare the memory-mapped mbox reader with the standard library's
+# mailbox.mbox on a generated mailbox.  Run directly, optionally giving
+# the number of messages (default one hundred thousand):
+#
+#     python3 gang-of-four/iterator/benchmarks.py [messages]
+
+import mailbox
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mbox import Mbox
+
+MESSAGES = 100000
+BODY = ''.join('Line {} of a body long enough to be worth skipping.\n'
+               .format(i) for i in range(40))
+
+def generate(path, n):
+    with open(path, 'w') as f:
+        for i in range(n):
+            f.write('From sender{0}@example.com Mon Jan  1 00:00:00 2018\n'
+                    'From: Sender {0} <sender{0}@example.com>\n'
+                    'To: Reader <reader@example.net>\n'
+                    'Subject: Message number {0}\n'
+                    'Date: Mon, 1 Jan 2018 00:00:00 -0000\n'
+                    '\n'.format(i))
+            f.write(BODY)
+            f.write('\n')
+
+def timed(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main(n):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'mbox')
+    index_path = path + '.index'
+    generate(path, n)
+    print('{:,} messages, {:.1f} MB'.format(n, os.path.getsize(path) / 1e6))
+
+    def stdlib_subjects():
+        return [m['Subject'] for m in mailbox.mbox(path)]
+
+    def mmap_subjects():
+        with Mbox(path) as box:
+            return [m.headers['Subject'] for m in box]
+
+    def stdlib_last():
+        box = mailbox.mbox(path)
+        return box[box.keys()[-1]]['Subject']
+
+    def mmap_last():
+        with Mbox(path) as box:
+            box.save_index(index_path)
+            return box[-1].headers['Subject']
+
+    def indexed_last():
+        with Mbox(path, index_path) as box:
+            return box[-1].headers['Subject']
+
+    try:
+        results = []
+        for name, function in [
+                ('mailbox.mbox, all subjects', stdlib_subjects),
+                ('Mbox, all subjects', mmap_subjects),
+                ('mailbox.mbox, last message', stdlib_last),
+                ('Mbox, last message + index', mmap_last),
+                ('Mbox, saved index', indexed_last),
+                ]:
+            result, elapsed, peak = timed(function)
+            results.append(result)
+            print('  {:<28} {:8.3f} s  peak {:7.1f} MB'.format(
+                name, elapsed, peak / 1e6))
+        assert results[0] == results[1]
+        assert results[2] == results[3] == results[4]
+    finally:
+        for p in path, index_path:
+            if os.path.exists(p):
+                os.remove(p)
+        os.rmdir(directory)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGES)
@@ -0,0 +1,228 @@
+# Read messages lazily from a Unix mbox file, which can run to many
+# gigabytes.  The file is memory-mapped rather than read, so scanning
+# for the "From " lines that separate messages touches only the pages
+# the operating system pages in; each message's headers are parsed as
+# it is reached, and its body is only decoded if someone asks for it.
+#
+# Finding message N still means scanning the N messages before it, so
+# the reader can save the byte offset of every message to an index
+# file that later runs load instead of scanning.  The index begins
+# with the mailbox's size, modification time, and a digest of its
+# first and last few kilobytes, so an index is not trusted for a
+# mailbox that has since been rewritten, even to the same size.
+
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+INDEX_HEADER = struct.Struct('<8sqq32s')
+INDEX_MAGIC = b'mboxidx1'
+SAMPLE_SIZE = 4096
+
+class Message(object):
+    """A message whose headers are parsed but whose body is not.
+
+    `headers` holds the header fields; lookups ignore case, and
+    get_all() returns every value of a repeated header.
+
+    """
+    __slots__ = ('envelope', 'headers', '_mbox', '_body_start', '_end')
+
+    def __init__(self, mbox, start, end):
+        self._mbox = mbox
+        self._end = end
+        newline = mbox.find(b'\n', start, end)
+        if newline == -1:
+            newline = end - 1
+        self.envelope = mbox[start:newline + 1].decode('utf-8', 'replace')
+        # The blank line after the headers, in a mailbox with Unix or
+        # with Windows line endings; only the headers are searched for
+        # the second kind, so that neither search reads a whole body.
+        header_end = mbox.find(b'\n\n', newline, end)
+        limit = end if header_end == -1 else header_end
+        crlf_end = mbox.find(b'\n\r\n', newline, limit)
+        if crlf_end != -1:
+            header_end = crlf_end
+            self._body_start = header_end + 3
+        elif header_end == -1:
+            header_end = self._body_start = end
+        else:
+            self._body_start = header_end + 2
+        self.headers = parse_headers(mbox[newline + 1:header_end])
+
+    @property
+    def body(self):
+        return self._mbox[self._body_start:self._end].decode(
+            'utf-8', 'replace')
+
+    def __repr__(self):
+        return '<Message {!r}>'.format(self.headers.get('Subject'))
+
+class Headers(object):
+    """Header fields in their original order, looked up ignoring case.
+
+    As with email.message.Message, indexing and get() return the first
+    field of a given name, and get_all() returns every one of them.
+
+    """
+    __slots__ = ('_fields', '_index')
+
+    def __init__(self, fields):
+        self._fields = fields
+        self._index = index = {}
+        for name, value in fields:
+            key = name.lower()
+            if key in index:
+                index[key].append(value)
+            else:
+                index[key] = [value]
+
+    def __getitem__(self, name):
+        return self._index[name.lower()][0]
+
+    def get(self, name, default=None):
+        values = self._index.get(name.lower())
+        return values[0] if values else default
+
+    def get_all(self, name, default=None):
+        values = self._index.get(name.lower())
+        return list(values) if values else default
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __iter__(self):
+        return (name for name, value in self._fields)
+
+    def keys(self):
+        return [name for name, value in self._fields]
+
+    def items(self):
+        return list(self._fields)
+
+    def __repr__(self):
+        return 'Headers({!r})'.format(self._fields)
+
+def parse_headers(data):
+    """Parse header lines into Headers, unfolding continuation lines."""
+    fields = []
+    for line in data.decode('utf-8', 'replace').split('\n'):
+        if line[:1] in (' ', '\t') and fields:
+            name, value = fields[-1]
+            fields[-1] = (name, value + ' ' + line.strip())
+        elif ':' in line:
+            name, value = line.split(':', 1)
+            fields.append((name.strip(), value.strip()))
+    return Headers(fields)
+
+class Mbox(object):
+    """A memory-mapped mbox file, iterable and indexable by message.
+
+    If `index_path` names an index saved by an earlier run for this
+    same mailbox, unchanged since, it is loaded instead of scanning.
+
+    """
+    def __init__(self, path, index_path=None):
+        self._file = open(path, 'rb')
+        self._map = b''
+        try:
+            self._stat = os.fstat(self._file.fileno())
+            self.size = self._stat.st_size
+            if self.size:
+                self._map = mmap.mmap(self._file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            self._offsets = None
+            if index_path is not None and os.path.exists(index_path):
+                self._offsets = load_index(index_path, self.index_header())
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _starts(self):
+        # Yield the offset of each "From " line that begins a message.
+        m = self._map
+        if m[:5] == b'From ':
+            yield 0
+        find = m.find
+        position = find(b'\nFrom ')
+        while position != -1:
+            yield position + 1
+            position = find(b'\nFrom ', position + 1)
+
+    def __iter__(self):
+        if self._offsets is not None:
+            offsets = self._offsets
+            for i in range(len(offsets) - 1):
+                yield Message(self._map, offsets[i], offsets[i + 1])
+            return
+        start = None
+        for next_start in self._starts():
+            if start is not None:
+                yield Message(self._map, start, next_start)
+            start = next_start
+        if start is not None:
+            yield Message(self._map, start, self.size)
+
+    @property
+    def offsets(self):
+        """Message start offsets, followed by the size of the file."""
+        if self._offsets is None:
+            offsets = array('q', self._starts())
+            offsets.append(self.size)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n):
+        offsets = self.offsets
+        if n < 0:
+            n += len(offsets) - 1
+        if not 0 <= n < len(offsets) - 1:
+            raise IndexError('message index out of range')
+        return Message(self._map, offsets[n], offsets[n + 1])
+
+    def index_header(self):
+        """Return the header that identifies this mailbox's index."""
+        m = self._map
+        digest = hashlib.blake2b(m[:SAMPLE_SIZE], digest_size=32)
+        digest.update(m[max(0, self.size - SAMPLE_SIZE):])
+        return INDEX_HEADER.pack(INDEX_MAGIC, self.size,
+                                 self._stat.st_mtime_ns, digest.digest())
+
+    def save_index(self, index_path):
+        with open(index_path, 'wb') as f:
+            f.write(self.index_header())
+            self.offsets.tofile(f)
+
+def load_index(index_path, header):
+    """Load a saved index, or return None if it is for another file."""
+    with open(index_path, 'rb') as f:
+        if f.read(INDEX_HEADER.size) != header:
+            return None
+        data = f.read()
+    offsets = array('q')
+    if len(data) % offsets.itemsize:
+        return None  # truncated
+    offsets.frombytes(data)
+    size = INDEX_HEADER.unpack(header)[1]
+    if not offsets or offsets[-1] != size:
+        return None
+    return offsets
@@ -0,0 +1,137 @@
+import mailbox
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import mbox
+
+EMAIL = os.path.join(os.path.dirname(__file__), 'email.txt')
+
+MESSAGES = [
+    'From a@example.com Mon Jan  1 00:00:00 2018\n'
+    'From: A <a@example.com>\n'
+    'Subject: First\n'
+    '\n'
+    'Hello.\n'
+    '>From here on, quoted.\n'
+    '\n',
+    'From b@example.com Mon Jan  1 00:00:01 2018\n'
+    'From: B <b@example.com>\n'
+    'Subject: A folded\n'
+    '  subject line\n'
+    '\n'
+    'Second body.\n',
+]
+
+class MboxTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'mbox')
+        with open(self.path, 'w') as f:
+            f.write(''.join(MESSAGES))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_email_txt(self):
+        with open(EMAIL) as f:
+            lines = f.readlines()
+        with mbox.Mbox(EMAIL) as box:
+            message, = box
+            self.assertEqual(message.envelope, lines[0])
+            self.assertEqual(message.headers['To'],
+                             'Mary Smith <mary@example.net>')
+            self.assertEqual(message.body, ''.join(lines[6:]))
+
+    def test_messages(self):
+        with mbox.Mbox(self.path) as box:
+            first, second = box
+            self.assertEqual(first.headers['Subject'], 'First')
+            self.assertEqual(first.body,
+                             'Hello.\n>From here on, quoted.\n\n')
+            self.assertEqual(second.headers['Subject'],
+                             'A folded subject line')
+            self.assertEqual(second.body, 'Second body.\n')
+
+    def test_matches_mailbox_module(self):
+        expected = [dict(m) for m in mailbox.mbox(self.path)]
+        with mbox.Mbox(self.path) as box:
+            self.assertEqual([m.headers['From'] for m in box],
+                             [h['From'] for h in expected])
+
+    def test_saved_index(self):
+        index_path = os.path.join(self.directory, 'mbox.index')
+        with mbox.Mbox(self.path) as box:
+            self.assertEqual(len(box), 2)
+            box.save_index(index_path)
+        with mbox.Mbox(self.path, index_path) as box:
+            self.assertIsNotNone(box._offsets)
+            self.assertEqual(box[-1].headers['From'], 'B <b@example.com>')
+            self.assertEqual([m.headers['Subject'] for m in box],
+                             ['First', 'A folded subject line'])
+            self.assertRaises(IndexError, box.__getitem__, 2)
+
+    def test_stale_index_is_ignored(self):
+        index_path = os.path.join(self.directory, 'mbox.index')
+        with mbox.Mbox(self.path) as box:
+            box.save_index(index_path)
+        with open(self.path, 'a') as f:
+            f.write(MESSAGES[0])
+        with mbox.Mbox(self.path, index_path) as box:
+            self.assertEqual(len(box), 3)
+
+    def test_index_of_rewritten_mailbox_is_ignored(self):
+        index_path = os.path.join(self.directory, 'mbox.index')
+        with mbox.Mbox(self.path) as box:
+            box.save_index(index_path)
+        # Rewrite the mailbox to the same size, with the same mtime,
+        # but with its messages in the other order.
+        st = os.stat(self.path)
+        with open(self.path, 'w') as f:
+            f.write(MESSAGES[1] + '\n' + MESSAGES[0][:-1])
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.path.getsize(self.path), st.st_size)
+        with mbox.Mbox(self.path, index_path) as box:
+            self.assertIsNone(box._offsets)
+            self.assertEqual([m.headers['Subject'] for m in box],
+                             ['A folded subject line', 'First'])
+
+    def test_repeated_and_lowercase_headers(self):
+        with open(self.path, 'w') as f:
+            f.write('From a@example.com Mon Jan  1 00:00:00 2018\n'
+                    'Received: one\nReceived: two\nsubject: Hi\n\nBody\n')
+        with mbox.Mbox(self.path) as box:
+            message, = box
+            self.assertEqual(message.headers.get_all('Received'),
+                             ['one', 'two'])
+            self.assertEqual(message.headers.get('Subject'), 'Hi')
+            self.assertEqual(message.body, 'Body\n')
+
+    def test_crlf_mailbox(self):
+        with open(self.path, 'wb') as f:
+            f.write(''.join(MESSAGES).replace('\n', '\r\n').encode())
+        with mbox.Mbox(self.path) as box:
+            first, second = box
+            self.assertEqual(first.headers['Subject'], 'First')
+            self.assertEqual(first.body,
+                             'Hello.\r\n>From here on, quoted.\r\n\r\n')
+            self.assertEqual(second.headers['Subject'],
+                             'A folded subject line')
+            self.assertEqual(second.body, 'Second body.\r\n')
+
+    def test_truncated_index_is_ignored(self):
+        index_path = os.path.join(self.directory, 'mbox.index')
+        with mbox.Mbox(self.path) as box:
+            box.save_index(index_path)
+        with open(index_path, 'r+b') as f:
+            f.truncate(os.path.getsize(index_path) - 3)
+        with mbox.Mbox(self.path, index_path) as box:
+            self.assertIsNone(box._offsets)
+            self.assertEqual(len(box), 2)
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        with mbox.Mbox(self.path) as box:
+            self.assertEqual(list(box), [])
+            self.assertEqual(len(box), 0)
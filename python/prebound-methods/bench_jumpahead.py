@@ -0,0 +1,44 @@
+# Check that spawn() substreams generated in separate processes
+# concatenate to the serial sequence, and time jumpahead() against
+# stepping the generator one value at a time.
+
+from multiprocessing import Pool
+from timeit import timeit
+
+import random8_fast
+
+def generate(seed_and_length):
+    seed, length = seed_and_length
+    generator = random8_fast.FastRandom8()
+    generator.set_seed(seed)
+    return bytes(generator.random() for i in range(length))
+
+if __name__ == '__main__':
+    K = 5
+    LENGTH = 51
+
+    random8_fast.set_seed(99)
+    serial = bytes(random8_fast.random() for i in range(K * LENGTH))
+
+    random8_fast.set_seed(99)
+    streams = random8_fast.spawn(K, LENGTH)
+    with Pool(K) as pool:
+        parts = pool.map(generate, [(s.seed, LENGTH) for s in streams])
+    assert b''.join(parts) == serial
+    print('{} substreams of {} values match the serial sequence'
+          .format(K, LENGTH))
+
+    N = 10 ** 6
+    random = random8_fast.random
+
+    def step():
+        for i in range(N):
+            random()
+
+    def jump():
+        random8_fast.jumpahead(N)
+
+    slow = min(timeit(step, number=1) for i in range(3))
+    fast = min(timeit(jump, number=1) for i in range(3))
+    print('random() x {:,}:  {:10.6f} s'.format(N, slow))
+    print('jumpahead({:,}): {:10.6f} s'.format(N, fast))
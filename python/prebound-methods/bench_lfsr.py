@@ -0,0 +1,39 @@
+# Period and throughput tests for each width of Galois LFSR.
+
+from timeit import timeit
+
+from lfsr import TAPS, GaloisLFSR, has_maximal_period
+
+N = 200000
+
+for width in 8, 16:
+    generator = GaloisLFSR(width)
+    generator.set_seed(1)
+    nums = set(generator.random() for i in range(generator.period))
+    assert len(nums) == generator.period
+    assert generator.seed == 1
+
+assert not has_maximal_period(GaloisLFSR(16, 0xb401))
+
+print('width  word    period  random() bits/s  random_word() bits/s')
+for width in TAPS:
+    for word_bits in sorted({8, min(width, 16)}):
+        generator = GaloisLFSR(width, word_bits=word_bits)
+        assert has_maximal_period(generator)
+        random = generator.random
+        random_word = generator.random_word
+
+        def one_bit_at_a_time():
+            for i in range(N):
+                random()
+
+        def one_word_at_a_time():
+            for i in range(N):
+                random_word()
+
+        slow = min(timeit(one_bit_at_a_time, number=1) for i in range(3))
+        fast = min(timeit(one_word_at_a_time, number=1) for i in range(3))
+        print('{:5}  {:4}  {:>8}  {:15,.0f}  {:20,.0f}'.format(
+            width, word_bits, '2**{}-1'.format(width),
+            N / slow, N * word_bits / fast))
+        assert N * word_bits / fast > 4 * N / slow
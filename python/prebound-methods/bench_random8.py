@@ -0,0 +1,28 @@
+# Compare one-at-a-time random() calls with the bulk random_bytes().
+
+from timeit import timeit
+
+import random8_fast
+
+N = 1000000
+
+def one_at_a_time():
+    random = random8_fast.random
+    return bytes(random() for i in range(N))
+
+def bulk():
+    return random8_fast.random_bytes(N)
+
+random8_fast.set_seed(1)
+a = one_at_a_time()
+random8_fast.set_seed(1)
+b = bulk()
+assert a == b
+
+slow = min(timeit(one_at_a_time, number=1) for i in range(3))
+fast = min(timeit(bulk, number=1) for i in range(3))
+
+print('random() x {:,}:   {:8.4f} s'.format(N, slow))
+print('random_bytes({:,}): {:8.4f} s'.format(N, fast))
+print('speedup: {:.0f}x'.format(slow / fast))
+assert slow / fast >= 20
@@ -0,0 +1,174 @@
+from functools import lru_cache
+from time import time_ns
+
+# Galois linear-feedback shift registers of any width.  Random8 is the
+# 8-bit member of this family; wider registers repeat far less often.
+# The tap masks below give maximal-length registers, which visit every
+# nonzero state before repeating.
+
+TAPS = {
+    8: 0xb8,
+    16: 0xb400,
+    32: 0x80200003,
+    64: 0xd800000000000000,
+}
+
+# Prime factors of each period 2**width - 1, which let us prove that
+# the period is maximal without having to step through all of it.
+
+PERIOD_FACTORS = {
+    8: (3, 5, 17),
+    16: (3, 5, 17, 257),
+    32: (3, 5, 17, 257, 65537),
+    64: (3, 5, 17, 257, 641, 65537, 6700417),
+}
+
+# Each step of a register is linear over GF(2), so a step is a bit
+# matrix, whose columns are the successors of the single bits, and n
+# steps are that matrix raised to the nth power, which repeated
+# squaring computes in O(log n) matrix products.
+
+def matrix_apply(matrix, vector):
+    result = 0
+    for column in matrix:
+        if not vector:
+            break
+        if vector & 1:
+            result ^= column
+        vector >>= 1
+    return result
+
+def matrix_multiply(a, b):
+    return [matrix_apply(a, column) for column in b]
+
+def matrix_power(matrix, n):
+    if n < 0:
+        raise ValueError('cannot raise a matrix to a negative power')
+    result = [1 << i for i in range(len(matrix))]
+    while n:
+        if n & 1:
+            result = matrix_multiply(matrix, result)
+        matrix = matrix_multiply(matrix, matrix)
+        n >>= 1
+    return result
+
+def has_maximal_period(generator):
+    """Prove that the register visits every nonzero state.
+
+    A register whose step matrix M satisfies M**period == I, but not
+    M**(period // p) == I for any prime p dividing the period, has
+    exactly that period.
+
+    """
+    identity = [1 << i for i in range(generator.width)]
+    period = generator.period
+    if matrix_power(generator.step_matrix, period) != identity:
+        return False
+    product = 1
+    for p in PERIOD_FACTORS[generator.width]:
+        product *= p
+        if matrix_power(generator.step_matrix, period // p) == identity:
+            return False
+    return product == period
+
+@lru_cache()
+def _word_tables(taps, word_bits):
+    """Build the tables that step a register `word_bits` times at once.
+
+    Stepping k times shifts the bits above the lowest k straight down,
+    because only a 1 leaving the bottom of the register triggers the
+    feedback.  Both the feedback XORed into the register and the k
+    output bits therefore depend only on the register's lowest k bits,
+    and can be looked up in tables indexed by them.  The tables are
+    linear too, so each entry is built from a smaller one with one XOR.
+
+    """
+    feedback = [0] * (1 << word_bits)
+    output = [0] * (1 << word_bits)
+    for i in range(word_bits):
+        seed = 1 << i
+        bits = 0
+        for j in range(word_bits):
+            bits |= (seed & 1) << j
+            seed = (seed >> 1) ^ taps if seed & 1 else seed >> 1
+        feedback[1 << i] = seed
+        output[1 << i] = bits
+    for b in range(3, 1 << word_bits):
+        low = b & -b
+        if low != b:
+            feedback[b] = feedback[low] ^ feedback[b ^ low]
+            output[b] = output[low] ^ output[b ^ low]
+    return feedback, output
+
+class GaloisLFSR(object):
+    def __init__(self, width, taps=None, word_bits=8):
+        if not 0 < word_bits <= width:
+            raise ValueError('word_bits must be between 1 and the width')
+        self.width = width
+        self.taps = TAPS[width] if taps is None else taps
+        self.period = (1 << width) - 1
+        self.word_bits = word_bits
+        self.step_matrix = [self._step(1 << i) for i in range(width)]
+
+        self._word_mask = (1 << word_bits) - 1
+        self._word_table, self._output_table = _word_tables(
+            self.taps, word_bits)
+
+        self.set_seed(time_ns() % self.period + 1)
+
+    def _step(self, seed):
+        return (seed >> 1) ^ self.taps if seed & 1 else seed >> 1
+
+    def set_seed(self, value):
+        self.seed = value
+
+    def random(self):
+        """Step the register once, returning its new state."""
+        seed = self.seed
+        self.seed = (seed >> 1) ^ self.taps if seed & 1 else seed >> 1
+        return self.seed
+
+    def random_word(self):
+        """Step the register `word_bits` times, returning the bits shifted out.
+
+        The lowest bit of the result is the first bit shifted out.
+
+        """
+        seed = self.seed
+        bits = seed & self._word_mask
+        self.seed = (seed >> self.word_bits) ^ self._word_table[bits]
+        return self._output_table[bits]
+
+    def jumpahead(self, n):
+        """Skip over the next `n` states, as though random() were called."""
+        if n < 0:
+            raise ValueError('cannot jump back {} states'.format(-n))
+        self.seed = matrix_apply(matrix_power(self.step_matrix, n),
+                                 self.seed)
+
+    def spawn(self, k, length=None):
+        """Split the next states into `k` independent generators.
+
+        Each generator will step `length` times (by default, an equal
+        share of one period) before reaching the states handed to the
+        next, so the streams laid end to end reproduce exactly what this
+        generator would have returned; this generator then skips past
+        all of them.
+
+        """
+        if k < 1:
+            raise ValueError('cannot split into {} streams'.format(k))
+        if length is None:
+            length = self.period // k
+        if length < 1:
+            raise ValueError('streams must hold at least one state')
+        if k * length > self.period:
+            raise ValueError('{} streams of {} values would overlap'
+                             .format(k, length))
+        streams = []
+        for i in range(k):
+            stream = GaloisLFSR(self.width, self.taps, self.word_bits)
+            stream.set_seed(self.seed)
+            streams.append(stream)
+            self.jumpahead(length)
+        return streams
@@ -0,0 +1,9 @@
+from lfsr import GaloisLFSR
+
+_instance = GaloisLFSR(64, word_bits=16)
+
+random = _instance.random
+set_seed = _instance.set_seed
+random_word = _instance.random_word
+jumpahead = _instance.jumpahead
+spawn = _instance.spawn
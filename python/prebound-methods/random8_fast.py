@@ -0,0 +1,140 @@
+from lfsr import matrix_apply, matrix_power
+from random8 import Random8
+
+# Each call to random() costs a method call, a divmod(), and a branch.
+# But the 8-bit register visits all 255 nonzero values before it
+# repeats, so after one trip around the cycle we know every value
+# that will ever follow a given seed.  Bulk output is then only a
+# matter of copying the right rotation of the cycle into a buffer.
+
+def _successor(seed):
+    seed, carry = divmod(seed, 2)
+    if carry:
+        seed ^= 0xb8
+    return seed
+
+SUCCESSOR = bytes(_successor(seed) for seed in range(256))
+
+def _cycle():
+    seed = 1
+    values = bytearray()
+    for i in range(255):
+        seed = SUCCESSOR[seed]
+        values.append(seed)
+    return bytes(values)
+
+CYCLE = _cycle()
+POSITION = [0] * 256
+for _i, _value in enumerate(CYCLE):
+    POSITION[_value] = _i
+
+# A step of the register is an 8x8 bit matrix over GF(2); see lfsr.py.
+
+STEP = [SUCCESSOR[1 << i] for i in range(8)]
+
+class FastRandom8(Random8):
+    def random_bytes(self, n):
+        buffer = bytearray(n)
+        self.fill(buffer)
+        return bytes(buffer)
+
+    def fill(self, buffer):
+        view = memoryview(buffer).cast('B')
+        n = len(view)
+        if not n:
+            return buffer
+        if not 0 < self.seed < 256:
+            raise ValueError('seed must be between 1 and 255')
+        start = (POSITION[self.seed] + 1) % 255
+        lap = CYCLE[start:] + CYCLE[:start]
+        filled = min(n, 255)
+        view[:filled] = lap[:filled]
+        while filled < n:
+            size = min(filled, n - filled)
+            view[filled:filled + size] = view[:size]
+            filled += size
+        self.seed = view[n - 1]
+        return buffer
+
+    def jumpahead(self, n):
+        """Skip over the next `n` values, as though random() were called."""
+        if n < 0:
+            raise ValueError('cannot jump back {} values'.format(-n))
+        self.seed = matrix_apply(matrix_power(STEP, n), self.seed)
+
+    def spawn(self, k, length=None):
+        """Split the next values into `k` independent generators.
+
+        Each generator will produce `length` values (by default, as
+        many as fit in one period) before reaching the values handed
+        to the next, so the streams laid end to end reproduce exactly
+        what this generator would have returned; this generator then
+        skips past all of them.
+
+        """
+        if k < 1:
+            raise ValueError('cannot split into {} streams'.format(k))
+        if length is None:
+            length = 255 // k
+        if length < 1:
+            raise ValueError('streams must hold at least one value')
+        if k * length > 255:
+            raise ValueError('{} streams of {} values would overlap'
+                             .format(k, length))
+        streams = []
+        for i in range(k):
+            stream = FastRandom8()
+            stream.set_seed(self.seed)
+            streams.append(stream)
+            self.jumpahead(length)
+        return streams
+
+_instance = FastRandom8()
+
+random = _instance.random
+set_seed = _instance.set_seed
+random_bytes = _instance.random_bytes
+fill = _instance.fill
+jumpahead = _instance.jumpahead
+spawn = _instance.spawn
+
+_slow = Random8()
+
+for seed in 1, 2, 0xb8, 255:
+    for n in 0, 1, 254, 255, 256, 1000:
+        _slow.set_seed(seed)
+        _instance.set_seed(seed)
+        expected = bytes(_slow.random() for i in range(n))
+        assert random_bytes(n) == expected
+        assert random() == _slow.random()
+
+_instance.set_seed(7)
+_buffer = bytearray(600)
+fill(memoryview(_buffer)[100:])
+_slow.set_seed(7)
+assert _buffer[100:] == bytes(_slow.random() for i in range(500))
+
+for seed in 1, 0x80, 255:
+    for n in 0, 1, 7, 254, 255, 256, 10 ** 12:
+        _slow.set_seed(seed)
+        for i in range(n % 255):
+            _slow.random()
+        _instance.set_seed(seed)
+        jumpahead(n)
+        assert random() == _slow.random()
+
+_instance.set_seed(42)
+_expected = random_bytes(255)
+_instance.set_seed(42)
+_streams = spawn(5, 50)
+assert b''.join(stream.random_bytes(50) for stream in _streams) \
+    == _expected[:250]
+assert random_bytes(5) == _expected[250:]
+
+for _call in lambda: jumpahead(-1), lambda: spawn(0), lambda: spawn(300):
+    try:
+        _call()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError')
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+
+from lfsr import GaloisLFSR, matrix_apply, matrix_multiply, matrix_power
+
+# A single shared generator makes every thread contend for one seed,
+# and unlocked updates from two threads at once can lose a value or
+# hand the same value to both.  Instead, this module's prebound
+# methods are bound to a threading.local instance, so each thread
+# steps a register of its own without taking any lock.
+
+class Substreams(object):
+    """Find the starting seeds of non-overlapping substreams.
+
+    Substream `i` starts `i * stride` states after the base seed, so
+    it depends only on `i`, never on which thread happened to ask
+    first.  Jumping that far applies the stride's matrix raised to
+    each power of two in `i`, all of which are computed up front.
+
+    """
+    def __init__(self, width, seed, stride):
+        base = GaloisLFSR(width)
+        self.count = base.period // stride
+        self._strides = [matrix_power(base.step_matrix, stride)]
+        while 1 << len(self._strides) < self.count:
+            last = self._strides[-1]
+            self._strides.append(matrix_multiply(last, last))
+        self.reset(seed)
+
+    def reset(self, seed):
+        self._seed = seed
+
+    def seed(self, index):
+        """Return the starting seed of substream `index`."""
+        if not 0 <= index < self.count:
+            raise ValueError('substream index must be between 0 and {}'
+                             .format(self.count - 1))
+        seed = self._seed
+        for matrix in self._strides:
+            if index & 1:
+                seed = matrix_apply(matrix, seed)
+            index >>= 1
+        return seed
+
+    def seed_for_name(self, name):
+        """Return the starting seed of the substream for a thread name."""
+        digest = hashlib.blake2b(name.encode('utf-8'), digest_size=8)
+        return self.seed(int.from_bytes(digest.digest(), 'big') % self.count)
+
+class ThreadLocalLFSR(threading.local, GaloisLFSR):
+    """A Galois LFSR whose state is separate in every thread.
+
+    threading.local calls __init__() again, with the same arguments,
+    the first time each new thread touches the instance.  Each thread
+    then starts on the substream picked by a digest of its name, so a
+    thread named the same way in every run draws the same values,
+    however the threads are scheduled.  Threads that share a name
+    share a stream; call seed_thread() to choose one explicitly.
+
+    """
+    def __init__(self, substreams, width):
+        GaloisLFSR.__init__(self, width)
+        self.set_seed(substreams.seed_for_name(
+            threading.current_thread().name))
+
+_substreams = Substreams(64, seed=1, stride=1 << 40)
+_instance = ThreadLocalLFSR(_substreams, 64)
+
+random = _instance.random
+set_seed = _instance.set_seed
+random_word = _instance.random_word
+
+def seed_thread(index):
+    """Start the calling thread over on substream `index`."""
+    set_seed(_substreams.seed(index))
+
+def seed_threads(value):
+    """Restart the substreams from `value`, reseeding the calling thread.
+
+    Threads that have already drawn a value keep their streams; other
+    threads start on their substreams from the new `value`.
+
+    """
+    _substreams.reset(value)
+    set_seed(_substreams.seed_for_name(threading.current_thread().name))
+
+_expected = GaloisLFSR(64)
+_expected.set_seed(1)
+_expected.jumpahead(3 << 40)
+assert _substreams.seed(3) == _expected.seed
@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import unittest
+
+# The modules of this chapter import each other by their plain names.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lfsr
+import random8
+import random8_fast
+import random_per_thread
+
+class GaloisLFSRTests(unittest.TestCase):
+    def test_8_bits_matches_random8(self):
+        expected = random8.Random8()
+        expected.set_seed(1)
+        generator = lfsr.GaloisLFSR(8)
+        generator.set_seed(1)
+        self.assertEqual([generator.random() for i in range(300)],
+                         [expected.random() for i in range(300)])
+
+    def test_random_word_matches_stepping(self):
+        for width in lfsr.TAPS:
+            for word_bits in 8, min(width, 16):
+                generator = lfsr.GaloisLFSR(width, word_bits=word_bits)
+                generator.set_seed(12345)
+                stepper = lfsr.GaloisLFSR(width)
+                stepper.set_seed(12345)
+                for i in range(20):
+                    bits = 0
+                    for j in range(word_bits):
+                        bits |= (stepper.seed & 1) << j
+                        stepper.random()
+                    self.assertEqual(generator.random_word(), bits)
+                    self.assertEqual(generator.seed, stepper.seed)
+
+    def test_periods(self):
+        for width in 8, 16:
+            generator = lfsr.GaloisLFSR(width)
+            generator.set_seed(1)
+            states = {generator.random() for i in range(generator.period)}
+            self.assertEqual(len(states), generator.period)
+            self.assertEqual(generator.seed, 1)
+        for width, factors in lfsr.PERIOD_FACTORS.items():
+            for p in factors:
+                self.assertTrue(all(p % d
+                                    for d in range(2, int(p ** 0.5) + 1)))
+            self.assertTrue(lfsr.has_maximal_period(lfsr.GaloisLFSR(width)))
+        self.assertFalse(lfsr.has_maximal_period(
+            lfsr.GaloisLFSR(16, 0xb401)))
+
+    def test_jumpahead_and_spawn(self):
+        generator = lfsr.GaloisLFSR(16)
+        generator.set_seed(99)
+        expected = [generator.random() for i in range(1000)]
+        generator.set_seed(99)
+        generator.jumpahead(600)
+        self.assertEqual(generator.random(), expected[600])
+        generator.set_seed(99)
+        streams = generator.spawn(4, 250)
+        self.assertEqual([s.random() for s in streams for i in range(250)],
+                         expected)
+
+    def test_bad_arguments(self):
+        generator = lfsr.GaloisLFSR(8)
+        self.assertRaises(ValueError, generator.jumpahead, -1)
+        self.assertRaises(ValueError, generator.spawn, 0)
+        self.assertRaises(ValueError, generator.spawn, 300)
+        self.assertRaises(ValueError, generator.spawn, 3, 100)
+
+class FastRandom8Tests(unittest.TestCase):
+    def test_bad_arguments(self):
+        generator = random8_fast.FastRandom8()
+        self.assertRaises(ValueError, generator.jumpahead, -1)
+        self.assertRaises(ValueError, generator.spawn, 0)
+        self.assertRaises(ValueError, generator.spawn, 300)
+
+class RandomPerThreadTests(unittest.TestCase):
+    def tearDown(self):
+        random_per_thread.seed_threads(1)
+
+    def test_threads_draw_their_own_streams(self):
+        # Many threads drawing at once must each see their own stream
+        # exactly, with no value duplicated or skipped, and which
+        # stream a thread sees must not depend on the order threads
+        # start in.
+        substreams = random_per_thread._substreams
+        results = {}
+
+        def draw(n, index):
+            if index is not None:
+                random_per_thread.seed_thread(index)
+            start = random_per_thread._instance.seed
+            results[threading.current_thread().name] = (
+                start, [random_per_thread.random() for i in range(n)])
+
+        threads = [threading.Thread(target=draw, name='worker-{}'.format(i),
+                                    args=(5000, i if i % 2 else None))
+                   for i in range(16)]
+        for thread in reversed(threads):
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 16)
+        self.assertEqual(len({start for start, values in results.values()}),
+                         16)
+        for i, thread in enumerate(threads):
+            start, values = results[thread.name]
+            if i % 2:
+                self.assertEqual(start, substreams.seed(i))
+            else:
+                self.assertEqual(start, substreams.seed_for_name(thread.name))
+            expected = lfsr.GaloisLFSR(64)
+            expected.set_seed(start)
+            self.assertEqual(values,
+                             [expected.random() for i in range(len(values))])
+            self.assertEqual(len(set(values)), len(values))
+
+    def test_bad_substream_index(self):
+        self.assertRaises(ValueError, random_per_thread.seed_thread, -1)
+        self.assertRaises(ValueError, random_per_thread.seed_thread,
+                          random_per_thread._substreams.count)
@@ -1,3 +1,19 @@
 #!/bin/bash
 
-python3 -m unittest "$@" gang-of-four/*/test*.py && make doctest
+# Runs the unit tests and the chapter doctests in parallel, then runs
+# the doctests again through Sphinx itself with "make doctest", which
+# also fails on any warning from the build.  Pass --no-sphinx to skip
+# that slower second pass.  Other arguments, like -k PATTERN, -v, or
+# the paths of particular files, go to bin/parallel_tests.py.
+sphinx=yes
+args=()
+for arg in "$@"; do
+    if [ "$arg" = --no-sphinx ]; then
+        sphinx=
+    else
+        args+=("$arg")
+    fi
+done
+python3 bin/parallel_tests.py "${args[@]}" && if [ -n "$sphinx" ]; then
+    make doctest
+fi